@@ -0,0 +1,149 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import platform
+import random
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Union
+
+from maze.distance import set_cache_budget
+from maze.generator import GENERATORS, generate_maze
+from maze.headless import solve_headless
+from maze.maze import Maze, MazeCell
+from maze.solver import ALGORITHMS, BaseSolver, complete
+
+MAZES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mazes")
+DEFAULT_SIZES = [100, 250, 500, 1000, 2000, 5000]
+FIELDS = ["maze", "size_x", "size_y", "algorithm", "solved", "path_length", "nodes_expanded", "frontier_peak",
+          "wall_time", "peak_memory"]
+
+Result = Dict[str, Union[str, int, float, bool, None]]
+
+
+def generate_random_maze(size: int, wall_ratio: float = 0.25, seed: int = 0) -> Maze:
+    # Square grid with randomly placed walls, START in the upper left and END in the lower right corner.
+    # A random monotone path between both is kept free, so the maze is always solvable.
+    rng = random.Random(seed)
+    threshold = int(256 * wall_ratio)
+    table = bytes(MazeCell.WALL.value if b < threshold else MazeCell.FREE.value for b in range(256))
+    maze = Maze()
+    maze.file_name = f"random-{size}x{size}"
+    maze.init_grid(size, size, MazeCell.WALL.value)
+    for row in range(size):
+        i = maze.index(0, row)
+        maze.grid[i:i + size] = rng.randbytes(size).translate(table)
+    col, row = 0, 0
+    while (col, row) != (size - 1, size - 1):
+        maze.grid[maze.index(col, row)] = MazeCell.FREE.value
+        if row == size - 1 or (col < size - 1 and rng.random() < 0.5):
+            col += 1
+        else:
+            row += 1
+    maze.grid[maze.index(0, 0)] = MazeCell.START.value
+    maze.grid[maze.index(size - 1, size - 1)] = MazeCell.END.value
+    return maze
+
+
+def drop_indexes(maze: Maze) -> None:
+    # Every run starts cold: Indexes built by an earlier run (distance field, junction graph, connectivity) would
+    # turn it into a cache hit, so they are dropped and their build counts as part of the search
+    maze.layout_changed()
+
+
+def measure_peak_memory(maze: Maze, algorithm: str) -> int:
+    # Peak memory allocated by the search itself, including its state layer and any index it builds
+    drop_indexes(maze)
+    solver = BaseSolver(maze)
+    pos_x, pos_y = solver.find_start()
+    tracemalloc.start()
+    try:
+        complete(ALGORITHMS[algorithm](solver, pos_x, pos_y))
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        solver.release()
+
+
+def run_benchmark(maze: Maze, algorithm: str, repeat: int = 1, memory: bool = True) -> Result:
+    # Best wall time of several runs, memory is measured in an extra run as tracing slows down the search
+    results = []
+    for _ in range(max(1, repeat)):
+        drop_indexes(maze)
+        results.append(solve_headless(maze, [algorithm])[0])
+    best = min(results, key=lambda result: result.elapsed)
+    return {
+        "maze": os.path.basename(maze.file_name) if maze.file_name else None,
+        "size_x": maze.size_x,
+        "size_y": maze.size_y,
+        "algorithm": algorithm,
+        "solved": best.solved,
+        "path_length": best.path_length,
+        "nodes_expanded": best.nodes_expanded,
+        "frontier_peak": best.frontier_peak,
+        "wall_time": best.elapsed,
+        "peak_memory": measure_peak_memory(maze, algorithm) if memory else None,
+    }
+
+
+def write_results(file_name: str, results: List[Result]) -> None:
+    if file_name.endswith(".csv"):
+        with open(file_name, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+    else:
+        with open(file_name, "w") as file:
+            json.dump({
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+            }, file, indent=2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maze solver benchmarks")
+    parser.add_argument("-a", "--algorithm", action="append", choices=list(ALGORITHMS), default=None,
+                        metavar="ALGORITHM", help="Algorithm to benchmark, repeat for several (Default: all)")
+    parser.add_argument("-m", "--maze", action="append", default=None,
+                        help="Maze file to benchmark, repeat for several (Default: all mazes in %s)" % MAZES_DIR)
+    parser.add_argument("-s", "--sizes", type=int, nargs="*", default=DEFAULT_SIZES,
+                        help="Sizes of the generated square mazes (Default: %s)" % " ".join(map(str, DEFAULT_SIZES)))
+    parser.add_argument("-g", "--generator", choices=["random"] + list(GENERATORS), default="random",
+                        help="Algorithm for generated mazes, random places walls anywhere (Default: random)")
+    parser.add_argument("--wall-ratio", type=float, default=0.25,
+                        help="Share of walls in mazes generated with random (Default: 0.25)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for generated mazes (Default: 0)")
+    parser.add_argument("-r", "--repeat", type=int, default=1, help="Runs per benchmark, the best is kept (Default: 1)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip measuring peak memory (Default: False)")
+    parser.add_argument("-o", "--output", default="benchmark-results.json",
+                        help="Results file, JSON or CSV depending on the suffix (Default: benchmark-results.json)")
+    args = parser.parse_args()
+
+    # The distance fields of known layouts would survive drop_indexes() in the cache of maze.distance
+    set_cache_budget(0)
+    algorithms = args.algorithm if args.algorithm else list(ALGORITHMS)
+    file_names = args.maze if args.maze is not None else sorted(glob.glob(os.path.join(MAZES_DIR, "*.txt")))
+    mazes = [lambda file_name=file_name: Maze(file_name=file_name) for file_name in file_names]
+    if args.generator == "random":
+        mazes += [lambda size=size: generate_random_maze(size, args.wall_ratio, args.seed) for size in args.sizes]
+    else:
+        mazes += [lambda size=size: generate_maze(size, size, args.generator, args.seed) for size in args.sizes]
+
+    results = []
+    for load_maze in mazes:
+        maze = load_maze()
+        for algorithm in algorithms:
+            result = run_benchmark(maze, algorithm, args.repeat, not args.no_memory)
+            results.append(result)
+            memory = "" if result["peak_memory"] is None else ", peak memory %d bytes" % result["peak_memory"]
+            print("%s (%dx%d) %s: %s, path length %d, %d nodes expanded, frontier peak %d, %.6fs%s" % (
+                result["maze"], result["size_x"], result["size_y"], algorithm,
+                "solved" if result["solved"] else "no solution found", result["path_length"],
+                result["nodes_expanded"], result["frontier_peak"], result["wall_time"], memory))
+        # Write after every maze, so results of long runs are not lost
+        write_results(args.output, results)
+    print("Results written to \"%s\"." % args.output)
@@ -1,11 +1,16 @@
 import argparse
+import cProfile
+import json
 import logging
 import os
 import sys
 
-from maze.gui import Gui
+from maze.batch import solve_directory
+from maze.generator import GENERATORS, generate_maze
 from maze.maze import Maze
-from maze.solver import Solver
+from maze.metrics import write_stats
+from maze.solver import ALGORITHMS, DEFAULT_ALGORITHMS, Solver
+from maze.trace import TracePlayer, TraceRecorder, load_trace
 
 
 def type_loglevel(level):
@@ -17,16 +22,74 @@ def type_loglevel(level):
     return loglevel
 
 
+def type_size(size):
+    try:
+        width, height = (int(x) for x in size.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("'%s' is not a valid size. Please use WIDTHxHEIGHT, e.g. 41x31" % size)
+    return width, height
+
+
 def main():
     # Initialise ArgumentParser
     parser = argparse.ArgumentParser(description="Maze")
+    parser.add_argument("command", nargs="?", choices=["run", "serve"], default="run",
+                        help="Solve a maze (run) or answer solve requests as JSON lines on a socket (serve) "
+                             "(Default: run)")
     parser.add_argument("-m", "--maze", type=str, default="mazes/maze.txt",
                         help="Filename of maze to load (Default: mazes/maze.txt)")
-    parser.add_argument("-d", "--delay", type=int, default=200,
-                        help="Delay for maze updates in milliseconds (Default: 200)")
+    parser.add_argument("-g", "--generate", type=type_size, default=None, metavar="WxH",
+                        help="Generate a maze of this size instead of loading one (Default: None)")
+    parser.add_argument("--generator", choices=list(GENERATORS), default="backtracker",
+                        help="Algorithm to generate mazes (Default: backtracker)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed for generated mazes, for reproducible results (Default: Random)")
+    parser.add_argument("-r", "--rate", type=float, default=5.0,
+                        help="Cells per second every solver advances in the GUI, e.g. 1000000 to finish big mazes "
+                             "in a few seconds or inf for no pacing at all (Default: 5)")
+    parser.add_argument("-d", "--delay", type=int, default=None,
+                        help="Deprecated, use --rate. Delay per cell in milliseconds, converted to a rate, 0 for no "
+                             "pacing (Default: None)")
     parser.add_argument("-rc", "--recursion-limit", type=int, default=None,
-                        help="Set python recursion limit (Default: Do not change)")
+                        help="Set python recursion limit, no longer needed by the solvers (Default: Do not change)")
     parser.add_argument("--fps", type=int, default=60, help="Max frames per second (Default: 60)")
+    parser.add_argument("-a", "--algorithm", action="append", choices=list(ALGORITHMS), default=None,
+                        metavar="ALGORITHM",
+                        help="Algorithm to run (%s), repeat to run several one after another "
+                             "(Default: depth-first and breadth-first)" % ", ".join(ALGORITHMS))
+    parser.add_argument("--side-by-side", action="store_true",
+                        help="Run all algorithms at the same time, each in its own panel (Default: False)")
+    parser.add_argument("--convert", type=str, default=None,
+                        help="Save the maze to this file and exit, use the suffix .mzb for the binary format "
+                             "and any other for text (Default: None)")
+    parser.add_argument("--batch", type=str, default=None, metavar="DIRECTORY",
+                        help="Solve all mazes (*.txt, *.mzb) below this directory headless on all cores and print "
+                             "the results as JSON lines (Default: None)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes for --batch or worker threads for serve "
+                             "(Default: Depends on the number of CPUs)")
+    parser.add_argument("--chunk-size", type=int, default=16,
+                        help="Number of mazes handed to a worker at once with --batch (Default: 16)")
+    parser.add_argument("--headless", action="store_true",
+                        help="Solve without GUI at full speed, print results per algorithm (Default: False)")
+    parser.add_argument("--record", type=str, default=None,
+                        help="Solve headless and save a trace of all cell changes to this file (Default: None)")
+    parser.add_argument("--replay", type=str, default=None,
+                        help="Replay a trace recorded with --record instead of running the solvers (Default: None)")
+    parser.add_argument("--steps-per-frame", type=int, default=1,
+                        help="Trace events to replay per frame, change with Up/Down while replaying (Default: 1)")
+    parser.add_argument("--stats", type=str, default=None,
+                        help="Save counters and phase timings of every solver run to this JSON file (Default: None)")
+    parser.add_argument("--profile", type=str, default=None,
+                        help="Solve headless under cProfile and save the pstats to this file (Default: None)")
+    parser.add_argument("--maze-dir", type=str, default="mazes",
+                        help="Directory of the mazes that can be solved with serve (Default: mazes)")
+    parser.add_argument("--socket", type=str, default=None,
+                        help="Path of a Unix socket to serve on instead of TCP (Default: None)")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Host to serve on (Default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port to serve on (Default: 8765)")
+    parser.add_argument("--cache-size", type=int, default=256,
+                        help="Memory budget in MiB for the mazes cached by serve (Default: 256)")
     parser.add_argument("--logfile", default="app.log", help="Path to the log file (Default: app.log)")
     parser.add_argument("-l", "--loglevel", type=type_loglevel, default="WARNING",
                         help="Log level verbosity (Default: WARNING, Recommended: DEBUG, INFO, WARNING or ERROR)")
@@ -35,6 +98,10 @@ def main():
     parser.add_argument("-vvv", "--very-very-verbose", action="store_true",
                         help="Very very verbose output (Default: False)")
     args = parser.parse_args()
+    if args.delay is not None:
+        args.rate = 1000 / args.delay if args.delay > 0 else float("inf")
+    if not args.rate > 0:  # Also rejects nan
+        parser.error("--rate must be positive")
 
     # Configure the logging module
     pid = os.getpid()
@@ -74,28 +141,86 @@ def main():
 
     # Run Application
     try:
-        # Load Maze
-        maze = Maze(file_name=args.maze, verbose=verbose)
-
-        # Configure and initialize GUI
-        gui = Gui(maze=maze, max_fps=args.fps, verbose=verbose)
-
-        # Start Solver Thread
-        solver = Solver(gui=gui, delay=args.delay/1000)
-        solver.start()
+        if args.command == "serve":
+            # Long running solve service, pygame is never imported
+            from maze.server import serve
+            serve(args.maze_dir, args.socket, args.host, args.port, args.workers, args.cache_size << 20)
+            logging.info("Application terminated.")
+            return
+
+        if args.batch:
+            # Solve a whole directory, one JSON line per maze
+            for result in solve_directory(args.batch, args.algorithm, args.workers, args.chunk_size):
+                print(json.dumps(result), flush=True)
+            logging.info("Application terminated.")
+            return
+
+        # Load or generate Maze
+        if args.generate:
+            maze = generate_maze(*args.generate, algorithm=args.generator, seed=args.seed)
+        else:
+            maze = Maze(file_name=args.maze, verbose=verbose)
+
+        if args.convert:
+            maze.write_maze_to_file(args.convert)
+            msg = "Saved maze to \"%s\"." % args.convert
+            logging.info(msg)
+            print(msg)
+            logging.info("Application terminated.")
+            return
+
+        if args.headless or args.record or args.profile:
+            # Solve at full speed, pygame is never imported
+            from maze.headless import solve_headless
+            trace = TraceRecorder(maze) if args.record else None
+            profiler = cProfile.Profile() if args.profile else None
+            if profiler is not None:
+                profiler.enable()
+            results = solve_headless(maze, args.algorithm, trace, collect_metrics=args.stats is not None)
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(args.profile)
+                print("Saved profile to \"%s\"." % args.profile)
+            for result in results:
+                print(result)
+            if trace is not None:
+                trace.save(args.record)
+                print("Saved trace with %d events to \"%s\"." % (trace.total, args.record))
+            if args.stats:
+                write_stats(args.stats, maze, [result.metrics for result in results])
+                print("Saved stats to \"%s\"." % args.stats)
+            logging.info("Application terminated.")
+            return
+
+        from maze.gui import Gui
+
+        if args.replay:
+            # Replay a recorded trace, no solver is running
+            player = TracePlayer(maze, load_trace(args.replay, maze), steps_per_frame=args.steps_per_frame)
+            gui = Gui(maze=maze, max_fps=args.fps, verbose=verbose, player=player)
+            gui.main_loop()
+            logging.info("Application terminated.")
+            print("Application terminated. Goodbye!")
+            return
+
+        # Configure the solvers, they all share the maze and keep their states in their own layers
+        algorithms = args.algorithm if args.algorithm else DEFAULT_ALGORITHMS
+        if args.side_by_side:
+            solvers = [Solver(maze, algorithms=[name], collect_metrics=args.stats is not None) for name in algorithms]
+        else:
+            solvers = [Solver(maze, algorithms=algorithms, collect_metrics=args.stats is not None)]
 
-        # Run the main loop
+        # Configure and initialize GUI, its main loop advances the solvers (one panel each)
+        gui = Gui(maze=maze, max_fps=args.fps, verbose=verbose, solvers=solvers, rate=args.rate)
         gui.main_loop()
 
-        # After the main loop finished, signal everyone to stop a.s.a.p.
         msg = "Shutting down."
         logging.info(msg)
         print(msg)
-        gui.running = False
-        solver.delay = 0.0
 
-        # Wait for any running threads to stop
-        solver.join()
+        if args.stats:
+            write_stats(args.stats, maze, [metrics for solver in solvers for metrics in solver.runs])
+            print("Saved stats to \"%s\"." % args.stats)
 
     except Exception as err:
         msg = "A critical error has occurred: %s" % err
@@ -0,0 +1,45 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Any, Dict, Iterator, List, Optional
+
+from maze.headless import solve_headless
+from maze.maze import MZB_SUFFIX, Maze
+
+MAZE_SUFFIXES = (".txt", MZB_SUFFIX)
+
+
+def find_maze_files(directory: str) -> List[str]:
+    # All maze files below the directory, sorted for a stable order of the results
+    file_names = []
+    for root, _, files in os.walk(directory):
+        file_names.extend(os.path.join(root, name) for name in files if name.endswith(MAZE_SUFFIXES))
+    return sorted(file_names)
+
+
+def solve_file(file_name: str, algorithms: Optional[List[str]] = None) -> Dict[str, Any]:
+    # Runs in a worker process, errors are reported as part of the result so the batch keeps going
+    try:
+        maze = Maze(file_name=file_name)
+        results = solve_headless(maze, algorithms)
+    except Exception as err:
+        logging.warning(f"Skipping {file_name}: {err}")
+        return {"maze": file_name, "error": f"{type(err).__name__}: {err}"}
+    return {
+        "maze": file_name,
+        "size_x": maze.size_x,
+        "size_y": maze.size_y,
+        "solvable": any(result.solved for result in results),
+        "load_time": maze.load_time,
+        "results": [result.to_dict() for result in results],
+    }
+
+
+def solve_directory(directory: str, algorithms: Optional[List[str]] = None, workers: Optional[int] = None,
+                    chunk_size: int = 16) -> Iterator[Dict[str, Any]]:
+    # Solve all mazes below the directory on all cores, results are yielded in the order of the file names
+    file_names = find_maze_files(directory)
+    logging.info(f"Solving {len(file_names)} mazes from {directory} with {workers or os.cpu_count()} workers.")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(solve_file, file_names, repeat(algorithms), chunksize=max(1, chunk_size))
@@ -0,0 +1,104 @@
+import logging
+from array import array
+from collections import deque
+from time import perf_counter
+from typing import Iterator, Optional, Set
+
+from maze.maze import Maze, MazeCell
+
+# Maps every cell value to 1 if it can be entered (anything but WALL), to 0 otherwise
+PASSABLE_TABLE = bytes([1, 0, 1, 1, 1, 1, 1]) + bytes(249)
+
+BUILD_CHUNK = 4096  # Cells labeled in between two steps of ConnectivityIndex.build()
+
+
+class ConnectivityIndex:
+    maze: Optional[Maze]  # Maze to index, released once the index is built
+    stride: int
+    labels: array  # Connected component (1, 2, ...) of every grid index, 0 for walls
+    components: int  # Number of components
+    end_components: Set[int]  # Components containing at least one END cell
+
+    def __init__(self, maze: Maze) -> None:
+        # The index is empty until build() ran to its end
+        self.maze = maze
+        self.stride = maze.stride
+        self.labels = array("i", [0]) * len(maze.grid)
+        self.components = 0
+        self.end_components = set()
+
+    def build(self) -> Iterator[None]:
+        # One flood fill per component, todo marks the cells not labeled yet so the next one is found by a fast find().
+        # Yields every BUILD_CHUNK cells, so the Gui can spread the build over several frames.
+        maze = self.maze
+        labels = self.labels
+        offsets = maze.offsets
+        todo = bytearray(maze.grid[:].translate(PASSABLE_TABLE))
+        steps = 0
+        i = todo.find(1)
+        while i != -1:
+            self.components += 1
+            label = self.components
+            todo[i] = 0
+            labels[i] = label
+            heads = deque([i])
+            while heads:
+                h = heads.popleft()
+                for offset in offsets:
+                    n = h + offset
+                    if todo[n]:
+                        todo[n] = 0
+                        labels[n] = label
+                        heads.append(n)
+                steps += 1
+                if steps == BUILD_CHUNK:
+                    steps = 0
+                    yield
+            i = todo.find(1, i + 1)
+        self.end_components = {labels[i] for i in maze.find_cells(MazeCell.END.value)}
+        self.maze = None
+
+    def component(self, col: int, row: int) -> int:
+        # Component of a cell, 0 for walls
+        return self.labels[(row + 1) * self.stride + col + 1]
+
+    def connected(self, a: int, b: int) -> bool:
+        # Whether there is a path between two cell indices
+        return self.labels[a] != 0 and self.labels[a] == self.labels[b]
+
+    def reaches_end(self, index: int) -> bool:
+        # Whether any END cell can be reached from a cell index
+        return self.labels[index] in self.end_components
+
+
+def build_connectivity(maze: Maze) -> Iterator[None]:
+    # Build the connectivity index of the maze step by step (see ConnectivityIndex.build()) unless it exists already.
+    # It is only kept if the layout did not change meanwhile.
+    if maze.connectivity is not None:
+        return
+    changed = []
+    maze.layout_listeners.append(changed.append)
+    try:
+        index = ConnectivityIndex(maze)
+        started = perf_counter()
+        elapsed = 0.0
+        for _ in index.build():
+            elapsed += perf_counter() - started
+            yield
+            started = perf_counter()
+        elapsed += perf_counter() - started
+    finally:
+        maze.layout_listeners.remove(changed.append)
+    if changed:
+        logging.info(f"Dropped connectivity index for {maze.file_name}, its layout changed while building it.")
+        return
+    maze.connectivity = index
+    logging.info(f"Built connectivity index for {maze.file_name} ({index.components} components) in {elapsed:.6f}s.")
+
+
+def get_connectivity(maze: Maze) -> ConnectivityIndex:
+    # Connectivity index of the maze, built once and reused until its layout changes. Building it floods the whole
+    # maze, so only callers answering many queries on the same layout should do so.
+    for _ in build_connectivity(maze):
+        pass
+    return maze.connectivity
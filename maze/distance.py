@@ -0,0 +1,132 @@
+import hashlib
+import logging
+import threading
+from array import array
+from collections import OrderedDict, deque
+from typing import List, Optional, Tuple
+
+from maze.maze import LAYOUT_TABLE, Maze, MazeCell
+
+# Distance fields of recently used maze layouts by content hash, least recently used ones are dropped once their
+# distances take more than _cache_budget bytes. Solvers in server threads share it, so it is only used under the lock.
+_cache: "OrderedDict[str, DistanceField]" = OrderedDict()
+_cache_budget = 64 << 20
+_cache_size = 0
+_cache_lock = threading.Lock()
+
+
+def set_cache_budget(budget: int) -> None:
+    # Limit the cache to budget bytes, 0 disables it (e.g. if the caller keeps track of the fields itself)
+    global _cache_budget
+    with _cache_lock:
+        _cache_budget = budget
+        _trim_cache()
+
+
+def _trim_cache() -> None:
+    global _cache_size
+    while _cache_size > _cache_budget:
+        _cache_size -= _cache.popitem(last=False)[1].memory()
+
+
+def layout_hash(maze: Maze) -> str:
+    digest = hashlib.blake2b(maze.grid[:].translate(LAYOUT_TABLE), digest_size=16)
+    digest.update(maze.stride.to_bytes(8, "little"))
+    return digest.hexdigest()
+
+
+class DistanceField:
+    stride: int
+    offsets: Tuple[int, int, int, int]
+    distances: array  # Steps to the nearest END cell for every grid index, -1 for walls and unreachable cells
+    expanded: int  # Number of cells expanded while building the field
+    queue_peak: int  # Maximum size of the BFS queue while building the field
+    uses: int  # Number of times the field was handed out by get_distance_field()
+
+    def __init__(self, maze: Maze) -> None:
+        self.stride = maze.stride
+        self.offsets = maze.offsets
+        self.distances = array("i", [-1]) * len(maze.grid)
+        self.expanded = 0
+        self.queue_peak = 0
+        self.uses = 0
+
+        # Multi-source BFS from all END cells
+        grid = maze.grid
+        wall = MazeCell.WALL.value
+        distances = self.distances
+        offsets = self.offsets
+        heads = deque(maze.find_cells(MazeCell.END.value))
+        for i in heads:
+            distances[i] = 0
+        peak = 0
+        while heads:
+            if len(heads) > peak:
+                peak = len(heads)
+            h = heads.popleft()
+            self.expanded += 1
+            d = distances[h] + 1
+            for offset in offsets:
+                n = h + offset
+                if distances[n] == -1 and grid[n] != wall:
+                    distances[n] = d
+                    heads.append(n)
+        self.queue_peak = peak
+
+    def distance(self, col: int, row: int) -> int:
+        # Steps from a cell to the nearest END cell, -1 if no END cell can be reached
+        return self.distances[(row + 1) * self.stride + col + 1]
+
+    def path(self, col: int, row: int) -> Optional[List[Tuple[int, int]]]:
+        # Shortest path from a cell to the nearest END cell (both included), None if there is none
+        path = self.path_indices((row + 1) * self.stride + col + 1)
+        if path is None:
+            return None
+        return [(i % self.stride - 1, i // self.stride - 1) for i in path]
+
+    def memory(self) -> int:
+        # Size of the distances in bytes
+        return len(self.distances) * self.distances.itemsize
+
+    def path_indices(self, index: int) -> Optional[List[int]]:
+        # Walk down the gradient, every step gets one closer to an END cell
+        distances = self.distances
+        d = distances[index]
+        if d == -1:
+            return None
+        path = [index]
+        while d > 0:
+            d -= 1
+            for offset in self.offsets:
+                if distances[index + offset] == d:
+                    index += offset
+                    break
+            path.append(index)
+        return path
+
+
+def get_distance_field(maze: Maze) -> DistanceField:
+    # Distance field of the maze, reused until its layout changes or taken from the cache of known layouts
+    global _cache_size
+    if maze.distance_field is not None:
+        maze.distance_field.uses += 1
+        return maze.distance_field
+    key = layout_hash(maze) if _cache_budget > 0 else None
+    field = None
+    if key is not None:
+        with _cache_lock:
+            field = _cache.get(key)
+            if field is not None:
+                _cache.move_to_end(key)
+    if field is None:
+        field = DistanceField(maze)
+        logging.info(f"Built distance field for {maze.file_name} ({field.expanded} cells expanded).")
+        if key is not None:
+            with _cache_lock:
+                if key not in _cache:
+                    _cache[key] = field
+                    _cache_size += field.memory()
+                    _trim_cache()
+    maze.distance_field = field
+    field.uses += 1
+    return field
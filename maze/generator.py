@@ -0,0 +1,129 @@
+import logging
+import random
+from array import array
+from time import perf_counter
+from typing import Callable, Dict, Optional
+
+from maze.maze import Maze, MazeCell
+
+# Both algorithms create perfect mazes (exactly one path between any two free cells): Rooms at odd columns and rows
+# are carved out of a grid full of walls and connected by removing the walls in between.
+
+
+def _init_maze(width: int, height: int) -> Maze:
+    if width < 3 or height < 3 or width < 5 and height < 5:
+        msg = f"A generated maze needs at least 5x3 or 3x5 cells (two rooms), got {width}x{height}."
+        logging.error(msg)
+        raise ValueError(msg)
+    maze = Maze()
+    maze.file_name = f"generated-{width}x{height}"
+    maze.init_grid(width, height, MazeCell.WALL.value)
+    return maze
+
+
+def _finish_maze(maze: Maze) -> Maze:
+    # START in the upper left, END in the lower right room
+    rooms_x, rooms_y = (maze.size_x - 1) // 2, (maze.size_y - 1) // 2
+    maze.grid[maze.index(1, 1)] = MazeCell.START.value
+    maze.grid[maze.index(2 * rooms_x - 1, 2 * rooms_y - 1)] = MazeCell.END.value
+    return maze
+
+
+def generate_backtracker(width: int, height: int, seed: Optional[int] = None) -> Maze:
+    # Iterative recursive backtracker (randomized DFS), creates long winding corridors
+    maze = _init_maze(width, height)
+    rng = random.Random(seed)
+    grid = maze.grid
+    free = MazeCell.FREE.value
+    rooms_x, rooms_y = (maze.size_x - 1) // 2, (maze.size_y - 1) // 2
+
+    # Rooms are tracked in their own buffer with a border marked as visited, so no bounds checks are needed
+    room_stride = rooms_x + 2
+    visited = bytearray([1]) * (room_stride * (rooms_y + 2))
+    for y in range(rooms_y):
+        i = (y + 1) * room_stride + 1
+        visited[i:i + rooms_x] = bytes(rooms_x)
+    room_offsets = (-1, 1, -room_stride, room_stride)
+    grid_offsets = (-2, 2, -2 * maze.stride, 2 * maze.stride)  # From a room to the neighboring room in the grid
+
+    room = room_stride + 1
+    cell = maze.index(1, 1)
+    visited[room] = 1
+    grid[cell] = free
+    rooms = [room]
+    cells = [cell]
+    choice = rng.choice
+    while rooms:
+        room = rooms[-1]
+        directions = [d for d in range(4) if not visited[room + room_offsets[d]]]
+        if not directions:
+            rooms.pop()
+            cells.pop()
+            continue
+        d = choice(directions)
+        cell = cells[-1] + grid_offsets[d]
+        visited[room + room_offsets[d]] = 1
+        grid[cell - grid_offsets[d] // 2] = free  # Wall in between
+        grid[cell] = free
+        rooms.append(room + room_offsets[d])
+        cells.append(cell)
+    return _finish_maze(maze)
+
+
+def generate_kruskal(width: int, height: int, seed: Optional[int] = None) -> Maze:
+    # Randomized Kruskal's algorithm, removes walls in random order unless both rooms are already connected
+    maze = _init_maze(width, height)
+    rng = random.Random(seed)
+    grid = maze.grid
+    stride = maze.stride
+    free = MazeCell.FREE.value
+    rooms_x, rooms_y = (maze.size_x - 1) // 2, (maze.size_y - 1) // 2
+
+    # Carve all rooms and collect the walls between them. A wall is stored as room number * 2 + orientation,
+    # separating the room from its right (orientation 0) or lower (orientation 1) neighbor.
+    walls = array("q")
+    for y in range(rooms_y):
+        i = maze.index(1, 2 * y + 1)
+        grid[i:i + 2 * rooms_x - 1:2] = bytes(rooms_x)
+        first = y * rooms_x
+        walls.extend(range(2 * first, 2 * (first + rooms_x - 1), 2))
+        if y < rooms_y - 1:
+            walls.extend(range(2 * first + 1, 2 * (first + rooms_x), 2))
+    rng.shuffle(walls)
+
+    # Union-find over the rooms with path halving
+    parents = array("i", range(rooms_x * rooms_y))
+    remaining = rooms_x * rooms_y - 1  # Number of walls still to remove
+    for wall in walls:
+        room = wall >> 1
+        a = room
+        while parents[a] != a:
+            parents[a] = parents[parents[a]]
+            a = parents[a]
+        b = room + (rooms_x if wall & 1 else 1)
+        while parents[b] != b:
+            parents[b] = parents[parents[b]]
+            b = parents[b]
+        if a != b:
+            parents[a] = b
+            y, x = divmod(room, rooms_x)
+            grid[maze.index(2 * x + 1, 2 * y + 1) + (stride if wall & 1 else 1)] = free
+            remaining -= 1
+            if remaining == 0:
+                break
+    return _finish_maze(maze)
+
+
+# Generators by name, as selected with --generator
+GENERATORS: Dict[str, Callable[[int, int, Optional[int]], Maze]] = {
+    "backtracker": generate_backtracker,
+    "kruskal": generate_kruskal,
+}
+
+
+def generate_maze(width: int, height: int, algorithm: str = "backtracker", seed: Optional[int] = None) -> Maze:
+    started = perf_counter()
+    maze = GENERATORS[algorithm](width, height, seed)
+    maze.load_time = perf_counter() - started
+    logging.info(f"Generated a {width}x{height} maze with {algorithm} (seed {seed}).")
+    return maze
@@ -1,8 +1,21 @@
-from typing import Union
+import math
+from time import monotonic
+from typing import List, Optional, Tuple, Union
 
 import pygame
 
-from maze.maze import Maze, MazeCellColors
+try:
+    import numpy
+except ImportError:  # Optional, the cells are rendered without it too (only slower)
+    numpy = None
+
+from maze.maze import Maze, MazeCell, MazeCellColors
+from maze.solver import Solver
+from maze.state import SolverState
+from maze.trace import TracePlayer
+
+MAX_ZOOM = 128.0  # Maximum number of pixels per cell
+ZOOM_STEP = 1.25  # Zoom factor per mouse wheel step
 
 
 class Gui:
@@ -12,57 +25,260 @@ class Gui:
     running: bool
     screen: pygame.Surface
     clock: pygame.time.Clock
+    player: Optional[TracePlayer]  # Replays a recorded trace instead of showing a running solver
+
+    # Solvers are advanced from the main loop, as many steps per frame as due at the rate (cells per second). At an
+    # infinite rate they take as many steps as fit into half a frame, the rest is left for drawing.
+    solvers: List[Solver]
+    rate: float
+    step_budget: float  # Steps due but not taken yet, fractions are carried over to the next frame
+
+    # The maze is shown once per panel (side by side), each panel with the state layer of one solver on top
+    layers: List[Optional[SolverState]]
+
+    # Every panel is rendered one pixel per cell (palette colors) and the visible part is scaled to the screen
+    cell_surfaces: List[pygame.Surface]
+    drawn_layers: List[Optional[SolverState]]  # Layers rendered into the cell surfaces, a new layer is rendered again
+    redraw: bool  # The screen is outdated (cells changed, zoom, pan or resize)
+    panel_width: int
+    zoom: float  # Pixels per cell
+    view_x: float  # Column and row shown in the upper left corner of every panel
+    view_y: float
+    dragging: bool  # The view is panned with the right mouse button
 
-    def __init__(self, maze: Maze, max_fps: int = 60, verbose: Union[bool, int] = False) -> None:
+    def __init__(self, maze: Maze, max_fps: int = 60, verbose: Union[bool, int] = False,
+                 player: Optional[TracePlayer] = None, solvers: Optional[List[Solver]] = None,
+                 rate: float = 5.0) -> None:
         self.maze = maze
         self.max_fps = max_fps
         self.verbose = verbose
+        self.player = player
+        self.solvers = solvers if solvers else []
+        self.rate = rate
+        self.step_budget = 0.0
+        self.layers = [None] * max(1, len(self.solvers))
+        if player is not None:
+            self.layers[0] = player.state
 
         self.running = True
+        self.cell_surfaces = []
+        self.drawn_layers = []
+        self.redraw = True
+        self.dragging = False
 
         default_cell_size = 42
         max_window_size_on_start = 640
-        window_width = min(max_window_size_on_start, maze.get_width() * default_cell_size)
+        window_width = min(max_window_size_on_start * len(self.layers),
+                           maze.get_width() * default_cell_size * len(self.layers))
         window_height = min(max_window_size_on_start, maze.get_height() * default_cell_size)
 
         pygame.init()
         self.screen = pygame.display.set_mode((window_width, window_height), pygame.RESIZABLE)
         pygame.display.set_caption("Maze")
+        self.fit_view()
 
         self.clock = pygame.time.Clock()
 
     def main_loop(self) -> None:
         # Pygame Main Loop
         while self.running:
-            # Check for quit events
+            # Check for quit, resize, keyboard and mouse events
+            # Mouse wheel: Zoom, Right mouse button: Pan, Z: Show the whole maze, Left mouse button: Toggle walls
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     self.running = False
+                elif event.type == pygame.VIDEORESIZE:
+                    self.fit_view()
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_z:
+                    self.fit_view()
+                elif event.type == pygame.KEYDOWN and self.player is not None:
+                    self.handle_replay_key(event.key)
+                elif event.type == pygame.MOUSEWHEEL:
+                    self.zoom_at(*pygame.mouse.get_pos(), ZOOM_STEP ** event.y)
+                elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 3:
+                    self.dragging = True
+                elif event.type == pygame.MOUSEBUTTONUP and event.button == 3:
+                    self.dragging = False
+                elif event.type == pygame.MOUSEMOTION and self.dragging:
+                    self.pan(*event.rel)
+                elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and self.player is None:
+                    self.toggle_wall(*event.pos)
 
-            # Render Maze
-            self.draw_maze(self.screen)
-            pygame.display.update()
+            # Advance the replay
+            if self.player is not None:
+                self.player.update()
+                if self.player.redraw:
+                    self.player.redraw = False
+                    self.drawn_layers = []
+                self.update_caption()
+
+            # Advance the solvers, each one shows its current state layer in its own panel
+            self.advance_solvers()
+
+            # Render Maze, the cells are only rendered completely when a solver started on a new layer
+            if len(self.drawn_layers) != len(self.layers) or any(
+                    a is not b for a, b in zip(self.drawn_layers, self.layers)):
+                self.render_cells()
+            else:
+                self.update_cells()
+            if self.redraw:
+                self.draw_maze(self.screen)
+                pygame.display.update()
+                self.redraw = False
 
             # Limit FPS
             self.clock.tick(self.max_fps)
         pygame.quit()
 
-    def draw_maze(self, screen: pygame.Surface) -> None:
-        # Calculate sizes
-        size_x, size_y = screen.get_size()
+    def advance_solvers(self) -> None:
+        if math.isinf(self.rate):
+            steps = math.inf
+            share = 0.5 / max(1, self.max_fps) / max(1, len(self.solvers))  # Seconds per solver and frame
+        else:
+            # Steps due since the last frame, a long frame (e.g. rendering a huge maze) catches up a quarter second
+            # at most
+            self.step_budget += self.rate * min(self.clock.get_time(), 250) / 1000
+            steps = int(self.step_budget)
+            self.step_budget -= steps
+            share = None
+        for panel, solver in enumerate(self.solvers):
+            solver.advance(steps, monotonic() + share if share is not None else None)
+            self.layers[panel] = solver.state
+
+    def toggle_wall(self, x: int, y: int) -> None:
+        # Turn a FREE cell into a WALL and the other way round, solvers following layout changes replan
+        cell = self.cell_at(x, y)
+        if cell is None:
+            return
+        col, row = cell
+        value = self.maze.get_field(col, row)
+        if value == MazeCell.FREE.value:
+            self.maze.set_field(col, row, MazeCell.WALL, delay=0)
+        elif value == MazeCell.WALL.value:
+            self.maze.set_field(col, row, MazeCell.FREE, delay=0)
+
+    def handle_replay_key(self, key: int) -> None:
+        # Space: Pause/Resume, Left/Right: Step one frame back/forward, Up/Down: Double/Halve steps per frame,
+        # F: Toggle fast-forward, Home/End: Seek to start/end, 0-9: Seek to 0% - 90%
+        player = self.player
+        if key == pygame.K_SPACE:
+            player.playing = not player.playing
+        elif key == pygame.K_RIGHT:
+            player.step(player.steps_per_frame)
+        elif key == pygame.K_LEFT:
+            player.seek(player.position - player.steps_per_frame)
+        elif key == pygame.K_UP:
+            player.steps_per_frame *= 2
+        elif key == pygame.K_DOWN:
+            player.steps_per_frame = max(1, player.steps_per_frame // 2)
+        elif key == pygame.K_f:
+            player.fast_forward = not player.fast_forward
+        elif key == pygame.K_HOME:
+            player.seek(0)
+        elif key == pygame.K_END:
+            player.seek(len(player))
+        elif pygame.K_0 <= key <= pygame.K_9:
+            player.seek(len(player) * (key - pygame.K_0) // 10)
+
+    def update_caption(self) -> None:
+        player = self.player
+        status = "Paused" if not player.playing else ("Fast-forward" if player.fast_forward else "Playing")
+        caption = f"Maze - Replay {player.position}/{len(player)} ({status}, {player.steps_per_frame} steps per frame)"
+        if caption != pygame.display.get_caption()[0]:
+            pygame.display.set_caption(caption)
+
+    def render_cells(self) -> None:
+        # Render the maze of every panel one pixel per cell, the pixel values index the color table (palette)
+        maze = self.maze
+        layers = list(self.layers)
+        # Anything changed from now on is updated by update_cells()
+        maze.track_changes()
+        for layer in layers:
+            if layer is not None:
+                layer.track_changes()
+        size = (maze.stride, len(maze.grid) // maze.stride)  # Including the border
+        self.cell_surfaces = []
+        for layer in layers:
+            if numpy is not None:
+                grid = numpy.frombuffer(maze.grid, numpy.uint8)
+                if layer is not None:
+                    grid = numpy.where(grid, grid, numpy.frombuffer(layer.cells, numpy.uint8))
+                surface = pygame.Surface(size, depth=8)
+                surface.set_palette(MazeCellColors.TABLE)
+                pygame.surfarray.blit_array(surface, grid.reshape(size[1], size[0]).T)
+            else:
+                surface = pygame.image.frombytes(layer.to_grid() if layer is not None else bytes(maze.grid), size, "P")
+                surface.set_palette(MazeCellColors.TABLE)
+            self.cell_surfaces.append(surface)
+        self.drawn_layers = layers
+        self.redraw = True
+
+    def update_cells(self) -> None:
+        # Update the pixels of the cells changed since the last frame. Layout changes are shown in every panel,
+        # state changes only in the panel of their layer.
+        grid = self.maze.grid
+        stride = self.maze.stride
+        layout_changes = self.maze.pop_dirty()
+        for layer, surface in zip(self.drawn_layers, self.cell_surfaces):
+            changes = layer.pop_dirty() | layout_changes if layer is not None else layout_changes
+            if not changes:
+                continue
+            pixels = pygame.PixelArray(surface)
+            for i in changes:
+                row, col = divmod(i, stride)
+                pixels[col, row] = grid[i] or (layer.cells[i] if layer is not None else 0)
+            pixels.close()
+            self.redraw = True
+
+    def fit_view(self) -> None:
+        # Zoom and pan to show the whole maze in every panel
+        size_x, size_y = self.screen.get_size()
         min_offset = 5
-        cell_size_x = (size_x - min_offset) // self.maze.size_x
-        cell_size_y = (size_y - min_offset) // self.maze.size_y
-        offset_x = (size_x - (cell_size_x * self.maze.size_x)) // 2
-        offset_y = (size_y - (cell_size_y * self.maze.size_y)) // 2
+        self.panel_width = max(1, size_x // len(self.layers))
+        self.zoom = max(1e-3, min((self.panel_width - min_offset) / self.maze.size_x,
+                                  (size_y - min_offset) / self.maze.size_y))
+        self.view_x = (self.maze.size_x - self.panel_width / self.zoom) / 2
+        self.view_y = (self.maze.size_y - size_y / self.zoom) / 2
+        self.redraw = True
 
-        # Fill Background
-        screen.fill(pygame.color.THECOLORS['gray'])
+    def zoom_at(self, x: int, y: int, factor: float) -> None:
+        # Zoom in (factor > 1) or out, keeping the cell below the mouse pointer in place
+        panel_x = x % self.panel_width
+        col, row = self.view_x + panel_x / self.zoom, self.view_y + y / self.zoom
+        self.zoom = min(MAX_ZOOM, max(1e-3, self.zoom * factor))
+        self.view_x, self.view_y = col - panel_x / self.zoom, row - y / self.zoom
+        self.redraw = True
 
-        # Render Maze
-        for row in range(self.maze.size_y):
-            for col in range(self.maze.size_x):
-                val = self.maze.get_field(col, row)
-                cell_color = MazeCellColors.get_color(val)
-                pygame.draw.rect(screen, cell_color,
-                                 (offset_x + col * cell_size_x, offset_y + row * cell_size_y, cell_size_x, cell_size_y))
+    def pan(self, dx: int, dy: int) -> None:
+        self.view_x -= dx / self.zoom
+        self.view_y -= dy / self.zoom
+        self.redraw = True
+
+    def cell_at(self, x: int, y: int) -> Optional[Tuple[int, int]]:
+        # Column and row of the cell at a screen position, None if there is none
+        col = math.floor(self.view_x + x % self.panel_width / self.zoom)
+        row = math.floor(self.view_y + y / self.zoom)
+        if 0 <= col < self.maze.size_x and 0 <= row < self.maze.size_y:
+            return col, row
+        return None
+
+    def draw_maze(self, screen: pygame.Surface) -> None:
+        # Scale the visible cells of every panel to the screen, cells outside of the viewport are never touched
+        screen.fill(pygame.color.THECOLORS['gray'])
+        size_y = screen.get_height()
+        zoom = self.zoom
+        x0, y0 = max(0, math.floor(self.view_x)), max(0, math.floor(self.view_y))
+        x1 = min(self.maze.size_x, math.ceil(self.view_x + self.panel_width / zoom))
+        y1 = min(self.maze.size_y, math.ceil(self.view_y + size_y / zoom))
+        if x1 <= x0 or y1 <= y0:
+            return
+        area = pygame.Rect(x0 + 1, y0 + 1, x1 - x0, y1 - y0)  # Skip the border
+        left, top = round((x0 - self.view_x) * zoom), round((y0 - self.view_y) * zoom)
+        width, height = round(x1 * zoom - x0 * zoom), round(y1 * zoom - y0 * zoom)
+        if width <= 0 or height <= 0:
+            return
+        for panel, surface in enumerate(self.cell_surfaces):
+            screen.set_clip(pygame.Rect(panel * self.panel_width, 0, self.panel_width, size_y))
+            scaled = pygame.transform.scale(surface.subsurface(area), (width, height))
+            screen.blit(scaled, (panel * self.panel_width + left, top))
+        screen.set_clip(None)
@@ -0,0 +1,59 @@
+import logging
+from time import perf_counter
+from typing import Dict, List, Optional, Union
+
+from maze.maze import Maze
+from maze.metrics import SolverMetrics
+from maze.solver import DEFAULT_ALGORITHMS, BaseSolver
+from maze.trace import TraceRecorder
+
+
+class SolveResult:
+    algorithm: str
+    solved: bool
+    path_length: int  # Number of steps from START to END (0 if not solved)
+    nodes_expanded: int
+    frontier_peak: int
+    elapsed: float  # Wall-clock time in seconds
+    metrics: Optional[SolverMetrics]  # Detailed metrics if collected
+
+    def __init__(self, algorithm: str, solved: bool, path_length: int, nodes_expanded: int, frontier_peak: int,
+                 elapsed: float, metrics: Optional[SolverMetrics] = None) -> None:
+        self.algorithm = algorithm
+        self.solved = solved
+        self.path_length = path_length
+        self.nodes_expanded = nodes_expanded
+        self.frontier_peak = frontier_peak
+        self.elapsed = elapsed
+        self.metrics = metrics
+
+    def to_dict(self) -> Dict[str, Union[str, bool, int, float]]:
+        return {"algorithm": self.algorithm, "solved": self.solved, "path_length": self.path_length,
+                "nodes_expanded": self.nodes_expanded, "frontier_peak": self.frontier_peak, "elapsed": self.elapsed}
+
+    def __str__(self) -> str:
+        status = "solved" if self.solved else "no solution found"
+        return (f"{self.algorithm}: {status}, path length {self.path_length}, "
+                f"{self.nodes_expanded} nodes expanded, {self.elapsed:.6f}s")
+
+
+def solve_headless(maze: Maze, algorithms: Optional[List[str]] = None, trace: Optional[TraceRecorder] = None,
+                   collect_metrics: bool = False) -> List[SolveResult]:
+    # Solve the maze with every requested algorithm at full speed, each one on its own state layer
+    results = []
+    for n, name in enumerate(algorithms if algorithms else DEFAULT_ALGORITHMS):
+        solver = BaseSolver(maze, trace=trace, collect_metrics=collect_metrics)
+        if trace is not None and n > 0:
+            trace.reset()
+        pos_x, pos_y = solver.find_start()
+        started = perf_counter()
+        try:
+            solved = solver.run_algorithm(name, pos_x, pos_y)
+        finally:
+            solver.release()
+        elapsed = perf_counter() - started
+        result = SolveResult(name, solved, solver.path_length, solver.nodes_expanded, solver.frontier_peak, elapsed,
+                             solver.metrics)
+        logging.info(f"Headless {result}")
+        results.append(result)
+    return results
@@ -0,0 +1,150 @@
+from array import array
+from heapq import heappop, heappush
+from typing import Callable, Dict, Generator, List, Optional, Tuple
+
+from maze.maze import Maze, MazeCell
+
+# Lifelong Planning A* (LPA*) with unit step costs. The search runs backwards from all END cells to the START
+# cell, so g is the number of steps to the nearest END cell. After a WALL/FREE cell flipped only the cells whose
+# distance changed are expanded again, instead of searching the whole maze from scratch.
+INFINITY = 1 << 30
+
+Key = Tuple[int, int]
+
+
+class LPAStar:
+    maze: Maze
+    start: int  # Cell index the shortest path is planned from
+    g: array  # Steps to the nearest END cell as of the last expansion of every cell
+    rhs: array  # One step more than the best neighbor (0 for END cells), a cell is consistent if g == rhs
+    heap: List[Tuple[int, int, int]]  # Inconsistent cells as (key, tie-breaker, cell), outdated entries are skipped
+    keys: Dict[int, Key]  # Current key of every queued cell
+    changes: List[int]  # Cells changed in the maze since the last apply_changes(), appended by a Maze listener
+    expanded: int  # Number of cells expanded by the last compute()
+    queue_peak: int  # Maximum number of queued cells during the last compute()
+
+    def __init__(self, maze: Maze, start: int) -> None:
+        self.maze = maze
+        self.start = start
+        size = len(maze.grid)
+        self.g = array("i", [INFINITY]) * size
+        self.rhs = array("i", [INFINITY]) * size
+        self.heap = []
+        self.keys = {}
+        self.changes = []
+        self.expanded = 0
+        self.queue_peak = 0
+        for i in maze.find_cells(MazeCell.END.value):
+            self.rhs[i] = 0
+            self._queue(i)
+
+    def _heuristic(self, index: int) -> int:
+        # Manhattan distance to the START cell, the search runs towards it
+        row, col = divmod(index, self.maze.stride)
+        start_row, start_col = divmod(self.start, self.maze.stride)
+        return abs(col - start_col) + abs(row - start_row)
+
+    def _key(self, index: int) -> Key:
+        best = min(self.g[index], self.rhs[index])
+        return best + self._heuristic(index), best
+
+    def _queue(self, index: int) -> None:
+        key = self._key(index)
+        self.keys[index] = key
+        heappush(self.heap, (key[0], key[1], index))
+
+    def _update(self, index: int) -> None:
+        # Recalculate rhs of a cell and (un)queue it depending on whether it is consistent now
+        grid = self.maze.grid
+        if grid[index] == MazeCell.END.value:
+            rhs = 0
+        elif grid[index] == MazeCell.WALL.value:
+            rhs = INFINITY
+        else:
+            g = self.g
+            rhs = min(g[index + offset] for offset in self.maze.offsets) + 1
+            if rhs > INFINITY:
+                rhs = INFINITY
+        self.rhs[index] = rhs
+        if self.g[index] != rhs:
+            self._queue(index)
+        else:
+            self.keys.pop(index, None)
+
+    def _top(self) -> Optional[Tuple[Key, int]]:
+        # Smallest valid queue entry, outdated entries are dropped on the way
+        heap = self.heap
+        while heap:
+            k1, k2, index = heap[0]
+            if self.keys.get(index) == (k1, k2):
+                return (k1, k2), index
+            heappop(heap)
+        return None
+
+    def cell_changed(self, index: int) -> None:
+        # Maze layout listener, the change is applied by apply_changes() before the next compute()
+        self.changes.append(index)
+
+    def apply_changes(self) -> int:
+        # Update the changed cells and their neighbors, returns the number of changed cells
+        n = len(self.changes)
+        cells = set(self.changes[:n])
+        del self.changes[:n]
+        wall = MazeCell.WALL.value
+        for index in cells:
+            self._update(index)
+            for offset in self.maze.offsets:
+                neighbor = index + offset
+                if self.maze.grid[neighbor] != wall or neighbor in cells:
+                    self._update(neighbor)
+        return len(cells)
+
+    def compute(self, expand: Optional[Callable[[int], None]] = None) -> Generator[None, None, bool]:
+        # Expand inconsistent cells until the distance of START is known, calls expand(index) and yields after every
+        # expansion. Returns whether START can reach an END cell.
+        g, rhs = self.g, self.rhs
+        offsets = self.maze.offsets
+        grid = self.maze.grid
+        wall = MazeCell.WALL.value
+        start = self.start
+        self.expanded = 0
+        self.queue_peak = len(self.keys)
+        while True:
+            top = self._top()
+            if top is None or (top[0] >= self._key(start) and rhs[start] == g[start]):
+                break
+            _, index = top
+            if len(self.keys) > self.queue_peak:
+                self.queue_peak = len(self.keys)
+            heappop(self.heap)
+            del self.keys[index]
+            self.expanded += 1
+            if expand is not None:
+                expand(index)
+            if g[index] > rhs[index]:
+                g[index] = rhs[index]
+            else:
+                g[index] = INFINITY
+                self._update(index)
+            for offset in offsets:
+                neighbor = index + offset
+                if grid[neighbor] != wall:
+                    self._update(neighbor)
+            yield
+        return g[start] < INFINITY
+
+    def distance(self) -> int:
+        # Steps from START to the nearest END cell, -1 if there is no path
+        return self.g[self.start] if self.g[self.start] < INFINITY else -1
+
+    def path(self) -> List[int]:
+        # Cell indices of a shortest path from START to an END cell (both included), empty if there is none
+        g = self.g
+        index = self.start
+        if g[index] >= INFINITY:
+            return []
+        path = [index]
+        while g[index] > 0:
+            index = min((index + offset for offset in self.maze.offsets), key=g.__getitem__)
+            path.append(index)
+        return path
@@ -0,0 +1,108 @@
+import logging
+from array import array
+from typing import List, Tuple, Union
+
+from maze.connectivity import PASSABLE_TABLE
+from maze.maze import Maze, MazeCell
+
+# Maps the number of passable neighbors of a cell to 1 if it is a node (dead end, junction or isolated cell), to 0 if
+# it is part of a corridor (exactly two passable neighbors)
+NODE_TABLE = bytes([1, 1, 0, 1, 1]) + bytes(251)
+
+
+class JunctionGraph:
+    # Corridors (cells with exactly two passable neighbors) are contracted into weighted edges between nodes:
+    # Junctions, dead ends and END cells. Every node has at most one edge per direction, so the edges are stored in
+    # flat arrays at 4 * node + k for the direction k (index into Maze.offsets, k ^ 1 is the opposite direction).
+    offsets: Tuple[int, int, int, int]
+    nodes: array  # Cell index of every node
+    node_ids: array  # Node of every grid index, -1 for corridor cells and walls
+    targets: array  # Node at the other end of the corridor leaving a node in a direction, -1 if there is none
+    lengths: array  # Number of steps along that corridor
+    exits: bytearray  # Number of edges of every node
+
+    def __init__(self, maze: Maze) -> None:
+        self.offsets = maze.offsets
+        grid = maze.grid
+        size = len(grid)
+        stride = maze.stride
+
+        # Count the passable neighbors of all cells at once, one byte each in big integers (no carries, at most 4)
+        passable = grid[:].translate(PASSABLE_TABLE)
+        bits = int.from_bytes(passable, "little")
+        degrees = ((bits >> 8) + (bits << 8) + (bits >> 8 * stride) + (bits << 8 * stride)) & ((1 << 8 * size) - 1)
+        candidates = (int.from_bytes(degrees.to_bytes(size, "little").translate(NODE_TABLE), "little") & bits)
+        is_node = bytearray(candidates.to_bytes(size, "little"))
+        for i in maze.find_cells(MazeCell.END.value):
+            is_node[i] = 1
+
+        self.nodes = array("i")
+        self.node_ids = array("i", [-1]) * size
+        i = is_node.find(1)
+        while i != -1:
+            self.node_ids[i] = len(self.nodes)
+            self.nodes.append(i)
+            i = is_node.find(1, i + 1)
+        self.targets = array("i", [-1]) * (4 * len(self.nodes))
+        self.lengths = array("i", [0]) * (4 * len(self.nodes))
+        self.exits = bytearray(len(self.nodes))
+
+        # Walk every corridor once and add its edge to the nodes at both ends
+        targets, lengths = self.targets, self.lengths
+        for node, index in enumerate(self.nodes):
+            for k, offset in enumerate(self.offsets):
+                if targets[4 * node + k] != -1 or not passable[index + offset]:
+                    continue
+                cells = self.corridor(grid, index, k)
+                last = self.offsets.index(cells[-1] - (cells[-2] if len(cells) > 1 else index))
+                target = self.node_ids[cells[-1]]
+                targets[4 * node + k] = target
+                lengths[4 * node + k] = len(cells)
+                targets[4 * target + (last ^ 1)] = node
+                lengths[4 * target + (last ^ 1)] = len(cells)
+        for node in range(len(self.nodes)):
+            self.exits[node] = sum(1 for k in range(4) if targets[4 * node + k] != -1)
+
+    def corridor(self, grid: Union[bytearray, bytes], index: int, k: int) -> List[int]:
+        # Cells along the corridor leaving a cell in direction k, up to the next node (included). Stops early when
+        # coming back to the cell itself (a cell on a closed loop without nodes) or if the layout changed meanwhile.
+        node_ids = self.node_ids
+        wall = MazeCell.WALL.value
+        previous, cell = index, index + self.offsets[k]
+        cells = [cell]
+        while node_ids[cell] == -1 and cell != index:
+            for offset in self.offsets:
+                n = cell + offset
+                if n != previous and grid[n] != wall:
+                    break
+            else:
+                break
+            previous, cell = cell, n
+            cells.append(cell)
+        return cells
+
+    def attach(self, grid: Union[bytearray, bytes], index: int) -> List[Tuple[int, int, int]]:
+        # Nodes reached from any cell without passing another node as (node, steps, direction of the first step),
+        # the direction is -1 if the cell is a node itself
+        if self.node_ids[index] != -1:
+            return [(self.node_ids[index], 0, -1)]
+        nodes = []
+        for k, offset in enumerate(self.offsets):
+            if grid[index + offset] != MazeCell.WALL.value:
+                cells = self.corridor(grid, index, k)
+                if self.node_ids[cells[-1]] != -1:
+                    nodes.append((self.node_ids[cells[-1]], len(cells), k))
+        return nodes
+
+    def memory(self) -> int:
+        # Size of all arrays in bytes
+        return (len(self.nodes) * self.nodes.itemsize + len(self.node_ids) * self.node_ids.itemsize +
+                len(self.targets) * (self.targets.itemsize + self.lengths.itemsize) + len(self.exits))
+
+
+def get_junction_graph(maze: Maze) -> JunctionGraph:
+    # Junction graph of the maze, built once and reused until its layout changes
+    if maze.junction_graph is None:
+        maze.junction_graph = JunctionGraph(maze)
+        logging.info(f"Built junction graph for {maze.file_name} ({len(maze.junction_graph.nodes)} nodes).")
+    return maze.junction_graph
@@ -1,8 +1,17 @@
 import logging
+import mmap
+import os
 import string
+import struct
+from array import array
 from enum import Enum
-from time import sleep
-from typing import List, Optional, Union, Tuple
+from time import perf_counter, sleep
+from typing import TYPE_CHECKING, Callable, List, Optional, Set, Union, Tuple
+
+if TYPE_CHECKING:
+    from maze.connectivity import ConnectivityIndex
+    from maze.distance import DistanceField
+    from maze.junction import JunctionGraph
 
 
 class MazeCell(Enum):
@@ -15,6 +24,32 @@ class MazeCell(Enum):
     HEAD: int = 6
 
 
+# Maps every cell value to its part of the static layout, solver states (and START) count as FREE
+LAYOUT_TABLE = bytes([MazeCell.FREE.value, MazeCell.WALL.value, MazeCell.FREE.value, MazeCell.END.value,
+                      MazeCell.FREE.value, MazeCell.FREE.value, MazeCell.FREE.value]) + bytes(249)
+
+SAVE_TABLE = LAYOUT_TABLE[:2] + bytes([MazeCell.START.value]) + LAYOUT_TABLE[3:]
+
+# Text maze format, Maps characters to cell values (and the other way round for saving)
+CHAR_TABLE = bytearray([255]) * 256
+CHAR_TABLE[ord(" ")] = MazeCell.FREE.value
+for char in "#-+|":
+    CHAR_TABLE[ord(char)] = MazeCell.WALL.value
+CHAR_TABLE[ord("S")] = MazeCell.START.value
+CHAR_TABLE[ord("E")] = MazeCell.END.value
+CHAR_TABLE = bytes(CHAR_TABLE)
+UNKNOWN_CHAR = bytes([255])
+NON_PRINTABLE = bytes(c for c in range(256) if chr(c) not in string.printable)
+TEXT_TABLE = b" #SE   " + bytes(249)
+
+# Binary maze format (*.mzb): A header padded to MZB_GRID_OFFSET bytes, the grid including its border
+# (one byte per cell) and the column and row of all END cells as int32 values.
+MZB_SUFFIX = ".mzb"
+MZB_MAGIC = b"MZB1"
+MZB_HEADER = struct.Struct("<4sIIiiIQ")  # Magic, size_x, size_y, start column, start row, END count, grid offset
+MZB_GRID_OFFSET = 4096  # Page aligned, so the grid can be memory-mapped
+
+
 class MazeCellColors:
     COLORS = {MazeCell.FREE: (255, 255, 255),  # White for FREE
               MazeCell.WALL: (0, 0, 0),  # Black for WALL
@@ -25,101 +60,136 @@ class MazeCellColors:
               MazeCell.HEAD: (0, 0, 255),  # Blue for HEAD
               }
 
+    # Colors indexed by cell value
+    TABLE = tuple(map(COLORS.get, sorted(MazeCell, key=lambda cell: cell.value)))
+
     @classmethod
     def get_color(cls, col: int):
         if 0 <= col < 7:
-            if col == 0:
-                return MazeCellColors.COLORS[MazeCell.FREE]
-            if col == 1:
-                return MazeCellColors.COLORS[MazeCell.WALL]
-            if col == 2:
-                return MazeCellColors.COLORS[MazeCell.START]
-            if col == 3:
-                return MazeCellColors.COLORS[MazeCell.END]
-            if col == 4:
-                return MazeCellColors.COLORS[MazeCell.PATH]
-            if col == 5:
-                return MazeCellColors.COLORS[MazeCell.VISITED]
-            if col == 6:
-                return MazeCellColors.COLORS[MazeCell.HEAD]
+            return cls.TABLE[col]
         raise ValueError(f"Invalid color value: {col}")
 
 
-class Maze:
+class ChangeTracker:
+    dirty: Optional[List[int]]  # Indices of changed cells since the last pop_dirty(), None if not tracked
+
+    def track_changes(self) -> None:
+        # Start recording the indices of changed cells (e.g. for rendering only what has changed)
+        self.dirty = []
+
+    def pop_dirty(self) -> Set[int]:
+        # Indices of all cells changed since the last call. Safe while another thread keeps changing cells,
+        # as slicing and deleting the list are atomic and cells appended meanwhile stay for the next call.
+        if self.dirty is None:
+            return set()
+        n = len(self.dirty)
+        cells = set(self.dirty[:n])
+        del self.dirty[:n]
+        return cells
+
+
+class Maze(ChangeTracker):
     file_name: Optional[str]
     verbose: Union[bool, int]
 
     size_x: int
     size_y: int
-    cells: List[List[int]]
+    # Cells are stored row by row in a flat buffer, surrounded by a one cell WALL border (sentinel), so
+    # neighbors can be reached by adding one of the offsets to a cell index without any bounds checks.
+    # The grid holds the layout (FREE, WALL, START and END) only, solvers keep their states in a
+    # maze.state.SolverState layer on top of it, so any number of them can share one maze.
+    stride: int  # Length of one row in the buffer (size_x + 2)
+    grid: Union[bytearray, mmap.mmap]
+    offsets: Tuple[int, int, int, int]  # Index offsets to the left, right, upper and lower neighbor
+    distance_field: Optional["DistanceField"]  # Set by maze.distance.get_distance_field(), reset on layout changes
+    connectivity: Optional["ConnectivityIndex"]  # Set by maze.connectivity.get_connectivity(), reset on layout changes
+    junction_graph: Optional["JunctionGraph"]  # Set by maze.junction.get_junction_graph(), reset on layout changes
+    load_time: float  # Seconds it took to load (or generate) the maze
+    layout_listeners: List[Callable[[int], None]]  # Called with the cell index whenever set_cell() changed the layout
 
     def __init__(self, file_name: Optional[str] = None, verbose: Union[bool, int] = False) -> None:
         self.file_name = file_name
         self.verbose = verbose
-        self.size_x, self.size_y = 1, 1
-        self.cells = [[MazeCell.WALL.value]]
+        self.dirty = None
+        self.load_time = 0.0
+        self.layout_listeners = []
+        self.init_grid(1, 1, MazeCell.WALL.value)
         if not file_name is None:
             pedantic = (True if self.verbose == 3 else False)
+            started = perf_counter()
             self.read_maze_from_file(self.file_name, pedantic)
+            self.load_time = perf_counter() - started
+
+    def init_grid(self, size_x: int, size_y: int, value: int = MazeCell.FREE.value) -> None:
+        self.set_grid(size_x, size_y, bytearray([MazeCell.WALL.value]) * ((size_x + 2) * (size_y + 2)))
+        if value != MazeCell.WALL.value:
+            row_of_cells = bytes([value]) * size_x
+            for row in range(size_y):
+                i = self.index(0, row)
+                self.grid[i:i + size_x] = row_of_cells
+
+    def set_grid(self, size_x: int, size_y: int, grid: Union[bytearray, mmap.mmap]) -> None:
+        # Use a prepared grid buffer (including its border), e.g. a copy or a memory-mapped file
+        self.size_x, self.size_y = size_x, size_y
+        self.stride = size_x + 2
+        self.grid = grid
+        self.offsets = (-1, 1, -self.stride, self.stride)
+        self.distance_field = None
+        self.connectivity = None
+        self.junction_graph = None
 
     def init_empty_maze(self, file_name: Optional[str] = None) -> None:
-        # Warning: self.cells[0] will not be set!
+        # Warning: The grid has no cells (only its border) until init_grid() is called again!
         if self.verbose > 1:
             msg = "Initializing empty maze"
             logging.debug(msg)
             if self.verbose > 2:
                 print(msg)
         self.file_name = file_name
-        self.size_x, self.size_y = 0, 0
-        self.cells = []
+        self.init_grid(0, 0)
 
     def read_maze_from_file(self, file_name: str, pedantic: bool = False) -> None:
+        if file_name.endswith(MZB_SUFFIX):
+            self.read_binary_maze_file(file_name, pedantic)
+            return
         self.init_empty_maze(file_name)
+        rows = []
         with open(file_name, "r") as file:
-            r = 0
-            for line in file:
-                c = 0
-                row = []
-                for char in line.rstrip("\n"):
-                    if not char in string.printable:
-                        continue
-                    if char == " ":
-                        row.append(MazeCell.FREE.value)
-                    elif char in ["#", "-", "+", "|"]:
-                        row.append(MazeCell.WALL.value)
-                    elif char == "S":
-                        row.append(MazeCell.START.value)
-                    elif char == "E":
-                        row.append(MazeCell.END.value)
-                    else:
-                        msg = f"Unknown maze character: \"{char}\"; Use Space, #, S or E." + self._add_log_info(c, r)
+            for r, line in enumerate(file):
+                # Translate the whole line at once, non-printable characters are dropped
+                chars = line.rstrip("\n").encode("ascii", "ignore")
+                row = chars.translate(CHAR_TABLE, NON_PRINTABLE)
+                if UNKNOWN_CHAR in row:
+                    chars = chars.translate(None, NON_PRINTABLE)
+                    c = row.find(UNKNOWN_CHAR)
+                    while c != -1:
+                        msg = f"Unknown maze character: \"{chr(chars[c])}\"; Use Space, #, S or E." + self._add_log_info(c, r)
                         if pedantic:
                             logging.error(msg, exc_info=True)
                             raise ValueError(msg)
-                        else:
-                            logging.warning(msg)
-                            row.append(MazeCell.FREE.value)
-                self.cells.append(row)
+                        logging.warning(msg)
+                        c = row.find(UNKNOWN_CHAR, c + 1)
+                    row = row.replace(UNKNOWN_CHAR, bytes([MazeCell.FREE.value]))
+                rows.append(row)
 
         # Validate data and calculate size
-        self.size_y = len(self.cells)
-        if self.size_y == 0:
+        if len(rows) == 0:
             msg = f"No maze cells found." + self._add_log_info(0, 0)
             logging.error(msg, exc_info=True)
             raise ValueError(msg)
-        self.size_x = len(self.cells[0])
 
-        # Ensure equal length of rows (Pad shorter rows with walls)
-        max_length = max(len(row) for row in self.cells)
-        for row in self.cells:
-            while len(row) < max_length:
-                row.append(MazeCell.WALL.value)
+        # Copy rows into the grid (Shorter rows are padded with walls)
+        self.init_grid(max(len(row) for row in rows), len(rows), MazeCell.WALL.value)
+        for r, row in enumerate(rows):
+            i = self.index(0, r)
+            self.grid[i:i + len(row)] = row
+        del rows
 
         # Validate that there is exact one starting position and at least one end position
         # For compatibility with https://pypi.org/project/labyrinth-py/ add a start and end position
         # in the upper left and lower right corner (with one wall tile to the edge of the world).
-        start_count = sum(row.count(MazeCell.START.value) for row in self.cells)
-        end_count = sum(row.count(MazeCell.END.value) for row in self.cells)
+        start_count = self.grid.count(MazeCell.START.value)
+        end_count = self.grid.count(MazeCell.END.value)
         if pedantic:
             if start_count != 1:
                 msg = f"Invalid number of start points: {start_count}. There must be exactly one start point." + self._add_log_info()
@@ -132,12 +202,100 @@ class Maze:
         else:
             if start_count == 0 and end_count == 0:
                 if self.size_x >= 3 and self.size_y >= 3 and self.size_x + self.size_y > 3 + 4:
-                    if self.cells[1][1] == MazeCell.FREE.value and self.cells[self.size_y - 2][self.size_x - 2] == MazeCell.FREE.value:
+                    start = self.index(1, 1)
+                    end = self.index(self.size_x - 2, self.size_y - 2)
+                    if self.grid[start] == MazeCell.FREE.value and self.grid[end] == MazeCell.FREE.value:
                         msg = "Adding START and END." + self._add_log_info()
                         logging.info(msg)
-                        self.cells[1][1] = MazeCell.START.value
-                        self.cells[self.size_y - 2][self.size_x - 2] = MazeCell.END.value
+                        self.grid[start] = MazeCell.START.value
+                        self.grid[end] = MazeCell.END.value
+
+    def read_binary_maze_file(self, file_name: str, pedantic: bool = False) -> None:
+        self.init_empty_maze(file_name)
+        with open(file_name, "rb") as file:
+            header = file.read(MZB_HEADER.size)
+            if len(header) < MZB_HEADER.size or not header.startswith(MZB_MAGIC):
+                msg = "Not a binary maze file." + self._add_log_info()
+                logging.error(msg, exc_info=True)
+                raise ValueError(msg)
+            _, size_x, size_y, start_col, start_row, end_count, grid_offset = MZB_HEADER.unpack(header)
+            length = (size_x + 2) * (size_y + 2)
+            file.seek(0, os.SEEK_END)
+            if file.tell() < grid_offset + length:
+                msg = "Binary maze file is truncated." + self._add_log_info()
+                logging.error(msg, exc_info=True)
+                raise ValueError(msg)
+            if grid_offset % mmap.ALLOCATIONGRANULARITY == 0:
+                # Pages are only read when accessed, changes stay private to this process
+                grid = mmap.mmap(file.fileno(), length, access=mmap.ACCESS_COPY, offset=grid_offset)
+            else:
+                file.seek(grid_offset)
+                grid = bytearray(file.read(length))
+        self.set_grid(size_x, size_y, grid)
 
+        # Validate that there is exact one starting position and at least one end position (from the header)
+        if pedantic:
+            if start_col < 0:
+                msg = "Invalid number of start points: 0. There must be exactly one start point." + self._add_log_info()
+                logging.error(msg, exc_info=True)
+                raise ValueError(msg)
+            if end_count < 1:
+                msg = f"Invalid number of end points: {end_count}. There must be at least one end point." + self._add_log_info()
+                logging.error(msg, exc_info=True)
+                raise ValueError(msg)
+
+    def write_maze_to_file(self, file_name: str) -> None:
+        # Save the layout of the maze (without solver states), the format depends on the file name suffix
+        if file_name.endswith(MZB_SUFFIX):
+            self.write_binary_maze_file(file_name)
+            return
+        with open(file_name, "wb") as file:
+            for row in range(self.size_y):
+                i = self.index(0, row)
+                file.write(self.grid[i:i + self.size_x].translate(TEXT_TABLE))
+                file.write(b"\n")
+
+    def write_binary_maze_file(self, file_name: str) -> None:
+        starts = self.find_cells(MazeCell.START.value)
+        ends = self.find_cells(MazeCell.END.value)
+        start_col, start_row = self.position(starts[0]) if starts else (-1, -1)
+        with open(file_name, "wb") as file:
+            file.write(MZB_HEADER.pack(MZB_MAGIC, self.size_x, self.size_y, start_col, start_row, len(ends),
+                                       MZB_GRID_OFFSET))
+            file.write(bytes(MZB_GRID_OFFSET - MZB_HEADER.size))
+            file.write(self.grid[:].translate(SAVE_TABLE))
+            # END cells are appended after the grid, so the grid offset does not depend on their number
+            file.write(array("i", [v for i in ends for v in self.position(i)]).tobytes())
+
+    def copy(self) -> "Maze":
+        maze = Maze(verbose=self.verbose)
+        maze.file_name = self.file_name
+        maze.set_grid(self.size_x, self.size_y, bytearray(self.grid))
+        maze.distance_field = self.distance_field
+        maze.connectivity = self.connectivity
+        maze.junction_graph = self.junction_graph
+        if self.dirty is not None:
+            maze.track_changes()
+        return maze
+
+    def index(self, col: int, row: int) -> int:
+        # Index of a cell in the grid buffer, no bounds checks!
+        return (row + 1) * self.stride + col + 1
+
+    def position(self, index: int) -> Tuple[int, int]:
+        # Column and row of a cell index in the grid buffer
+        row, col = divmod(index, self.stride)
+        return col - 1, row - 1
+
+    def find_cells(self, value: int) -> List[int]:
+        # Indices of all cells with the given value
+        cells = []
+        char = bytes([value])
+        i = self.grid.find(char)
+        while i != -1:
+            cells.append(i)
+            i = self.grid.find(char, i + 1)
+        return cells
 
     def set_field(self, col: int, row: int, value: Union[MazeCell, int], delay: int = 10) -> None:
         self._check_bounds(col, row)  # Raises IndexError() on Out-of-Bounds error
@@ -148,28 +306,48 @@ class Maze:
 
         if isinstance(value, MazeCell):
             val = value.value
-            name = value.name
         else:
             val = value
             try:
-                name = MazeCell(value).name
+                MazeCell(value)
             except ValueError as err:
                 msg = f"Value (int){value} is not a valid MazeCell ENUM (0-6) at row {row}, column {col}: {err}"
                 logging.error(msg, exc_info=True)
                 print(msg)
                 raise err
 
-        # Set the field in the maze
-        sleep(delay / 3000)
-        if self.verbose > 0:
-            logging.debug(f"Set field at ({row=}, {col=}) to {name} ({val=}).")
-        self.cells[row][col] = val
-        sleep(delay / 7000)
+        self.set_cell(self.index(col, row), val, delay)
+
+    def set_cell(self, index: int, value: int, delay: int = 10) -> None:
+        # Fast path working on grid indices, the value is expected to be a valid MazeCell value
+        # Set the field in the maze (A delay of 0 skips the sleeps entirely)
+        if delay:
+            sleep(delay / 3000)
+        if self.verbose > 0 and logging.getLogger().isEnabledFor(logging.DEBUG):
+            col, row = self.position(index)
+            logging.debug("Set field at (row=%d, col=%d) to %s (val=%d).", row, col, MazeCell(value).name, value)
+        changed = LAYOUT_TABLE[value] != LAYOUT_TABLE[self.grid[index]]
+        self.grid[index] = value
+        if changed:
+            self.layout_changed(index)
+        if self.dirty is not None:
+            self.dirty.append(index)
+        if delay:
+            sleep(delay / 7000)
+
+    def layout_changed(self, index: Optional[int] = None) -> None:
+        # A WALL or END cell was added or removed, anything derived from the layout is outdated now
+        self.distance_field = None
+        self.connectivity = None
+        self.junction_graph = None
+        if index is not None:
+            for listener in self.layout_listeners:
+                listener(index)
 
     def get_field(self, col: int, row: int) -> int:
         self._check_bounds(col, row)  # Raises IndexError() on Out-of-Bounds error
         try:
-            return self.cells[row][col]
+            return self.grid[self.index(col, row)]
         except Exception as err:
             msg = f"A critical error has occurred at get_field(row={row}, col={col}): {err}"
             logging.error(msg, exc_info=True)
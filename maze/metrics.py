@@ -0,0 +1,77 @@
+import json
+import logging
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from maze.maze import Maze
+
+# Phases of a solver run, the time of each one is accumulated separately
+PHASES = ("load", "solve", "reconstruct")
+
+
+class SolverMetrics:
+    algorithm: str
+    solved: bool
+    nodes_expanded: int
+    frontier_peak: int  # Maximum size of the frontier (queue, stack or heap)
+    cells_written: int  # Number of state changes written to the state layer
+    path_length: int  # Number of steps from START to END (0 if not solved)
+    timings: Dict[str, float]  # Seconds spent in every phase
+    phase: Optional[str]  # Phase currently timed, None if stopped
+    started: float  # Start time of the current phase
+
+    def __init__(self, algorithm: str, load_time: float = 0.0) -> None:
+        self.algorithm = algorithm
+        self.solved = False
+        self.nodes_expanded = 0
+        self.frontier_peak = 0
+        self.cells_written = 0
+        self.path_length = 0
+        self.timings = dict.fromkeys(PHASES, 0.0)
+        self.timings["load"] = load_time
+        self.phase = None
+        self.started = 0.0
+
+    def start(self, phase: str) -> None:
+        # Stop timing the current phase (if any) and start the next one
+        now = perf_counter()
+        if self.phase is not None:
+            self.timings[self.phase] += now - self.started
+        self.phase = phase
+        self.started = now
+
+    def pause(self) -> None:
+        # Stop the clock without leaving the current phase, e.g. while a stepped search is suspended in the Gui
+        if self.phase is not None:
+            self.timings[self.phase] += perf_counter() - self.started
+
+    def resume(self) -> None:
+        self.started = perf_counter()
+
+    def stop(self) -> None:
+        if self.phase is not None:
+            self.timings[self.phase] += perf_counter() - self.started
+            self.phase = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"algorithm": self.algorithm, "solved": self.solved, "nodes_expanded": self.nodes_expanded,
+                "frontier_peak": self.frontier_peak, "cells_written": self.cells_written,
+                "path_length": self.path_length, "timings": dict(self.timings)}
+
+    def __str__(self) -> str:
+        timings = ", ".join(f"{phase} {seconds:.6f}s" for phase, seconds in self.timings.items())
+        return (f"{self.algorithm}: {self.nodes_expanded} nodes expanded, frontier peak {self.frontier_peak}, "
+                f"{self.cells_written} cells written, path length {self.path_length} ({timings})")
+
+
+def write_stats(file_name: str, maze: "Maze", runs: List[SolverMetrics]) -> None:
+    # JSON dump of the metrics of all runs on a maze
+    with open(file_name, "w") as file:
+        json.dump({
+            "maze": maze.file_name,
+            "size_x": maze.size_x,
+            "size_y": maze.size_y,
+            "runs": [metrics.to_dict() for metrics in runs],
+        }, file, indent=2)
+    logging.info(f"Saved metrics of {len(runs)} runs to {file_name}.")
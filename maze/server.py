@@ -0,0 +1,265 @@
+import asyncio
+import json
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from maze.connectivity import get_connectivity
+from maze.distance import set_cache_budget
+from maze.maze import Maze, MazeCell
+from maze.solver import ALGORITHMS, BaseSolver
+
+# Protocol: One JSON object per line in both directions. A request {"id": 1, "method": "solve", "params": {...}}
+# is answered with {"id": 1, "result": {...}} or {"id": 1, "error": "..."}. Methods:
+#   solve(maze_id, start=None, end=None, algorithm="a-star", path=True)  Solve a maze, start and end as [col, row]
+#                                                                       replace its START and END cells, pairs
+#                                                                       that are not connected are answered at once
+#   load(maze_id)                                                       Load a maze into the cache
+#   stats()                                                             Cache statistics
+# A maze_id is the file name of a maze (*.txt or *.mzb) relative to the maze directory of the server.
+
+Position = Tuple[int, int]
+CacheKey = Tuple[str, Optional[Position]]  # Maze id and the position of its END cell if moved
+
+
+def maze_memory(maze: Maze) -> int:
+    # Approximate memory held by a maze and the indexes computed for it, in bytes
+    size = len(maze.grid)
+    if maze.distance_field is not None:
+        size += maze.distance_field.memory()
+    if maze.connectivity is not None:
+        size += len(maze.connectivity.labels) * maze.connectivity.labels.itemsize
+    if maze.junction_graph is not None:
+        size += maze.junction_graph.memory()
+    return size
+
+
+def cell_index(maze: Maze, position: Position) -> int:
+    # Index of a cell given by a request, it must be within the maze and not a wall
+    col, row = position
+    if maze.get_field(col, row) == MazeCell.WALL.value:  # Raises IndexError() on Out-of-Bounds error
+        raise ValueError(f"Cell ({col}, {row}) is a wall.")
+    return maze.index(col, row)
+
+
+def endpoints_connected(maze: Maze, start: Optional[Position], end: Optional[Position]) -> bool:
+    # Answered by the connectivity index of the maze, moving START and END does not change it
+    connectivity = get_connectivity(maze)
+    if start is not None:
+        start_index = cell_index(maze, start)
+    else:
+        start_index = maze.grid.find(bytes([MazeCell.START.value]))
+        if start_index == -1:
+            return True  # Let the solver report the missing START cell
+    if end is None:
+        return connectivity.reaches_end(start_index)
+    return connectivity.connected(start_index, cell_index(maze, end))
+
+
+def move_end(maze: Maze, end: Position) -> Maze:
+    # Copy of the maze with all its END cells replaced by the given position. A new START needs no copy, the solvers
+    # can start anywhere (see BaseSolver.new_state()).
+    moved = maze.copy()
+    index = cell_index(moved, end)
+    for i in moved.find_cells(MazeCell.END.value):
+        moved.grid[i] = MazeCell.FREE.value
+    moved.grid[index] = MazeCell.END.value
+    moved.layout_changed()
+    return moved
+
+
+class MazeCache:
+    budget: int  # Memory budget in bytes, least recently used mazes are evicted beyond it
+    mazes: "OrderedDict[CacheKey, Maze]"
+    hits: int
+    misses: int
+
+    def __init__(self, budget: int) -> None:
+        self.budget = budget
+        self.mazes = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: CacheKey) -> Optional[Maze]:
+        maze = self.mazes.get(key)
+        if maze is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.mazes.move_to_end(key)
+        return maze
+
+    def put(self, key: CacheKey, maze: Maze) -> None:
+        self.mazes[key] = maze
+        self.mazes.move_to_end(key)
+        self.evict()
+
+    def memory(self) -> int:
+        # Indexes like distance fields are built lazily, so the size is taken anew every time
+        return sum(maze_memory(maze) for maze in self.mazes.values())
+
+    def evict(self) -> None:
+        # The most recently used maze always stays, even if it alone exceeds the budget
+        memory = self.memory()
+        while memory > self.budget and len(self.mazes) > 1:
+            key, maze = self.mazes.popitem(last=False)
+            memory -= maze_memory(maze)
+            logging.info(f"Evicted maze {key} from the cache.")
+
+
+class MazeServer:
+    maze_dir: str  # Mazes are only loaded from below this directory
+    cache: MazeCache
+    executor: ThreadPoolExecutor  # Loads and solves mazes, the event loop only dispatches requests
+    loading: Dict[CacheKey, "asyncio.Future[Maze]"]  # Mazes being loaded, concurrent requests wait for the same load
+
+    def __init__(self, maze_dir: str, cache_budget: int, workers: Optional[int] = None) -> None:
+        self.maze_dir = os.path.realpath(maze_dir)
+        self.cache = MazeCache(cache_budget)
+        # Distance fields are counted with the mazes they belong to, a second cache would keep them past evict()
+        set_cache_budget(0)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.loading = {}
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                response = await self.handle_request(line)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError as err:
+            logging.info(f"Client disconnected: {err}")
+        finally:
+            writer.close()
+
+    async def handle_request(self, line: bytes) -> Dict[str, Any]:
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a JSON object.")
+            request_id = request.get("id")
+            method = request.get("method")
+            params = request.get("params", {})
+            if method == "solve":
+                result = await self.solve(**params)
+            elif method == "load":
+                result = await self.load(**params)
+            elif method == "stats":
+                result = self.stats()
+            else:
+                raise ValueError(f"Unknown method: {method}")
+        except Exception as err:
+            # Report any error to the client, the server keeps running
+            logging.warning(f"Request failed: {err}", exc_info=True)
+            return {"id": request_id, "error": f"{type(err).__name__}: {err}"}
+        return {"id": request_id, "result": result}
+
+    async def get_maze(self, maze_id: str, end: Optional[Position] = None) -> Maze:
+        key = (maze_id, end)
+        maze = self.cache.get(key)
+        if maze is not None:
+            return maze
+        if key in self.loading:
+            return await self.loading[key]
+        future = asyncio.get_running_loop().create_future()
+        self.loading[key] = future
+        try:
+            if end is None:
+                maze = await asyncio.get_running_loop().run_in_executor(self.executor, Maze, self.resolve(maze_id))
+            else:
+                base = await self.get_maze(maze_id)
+                maze = await asyncio.get_running_loop().run_in_executor(self.executor, move_end, base, end)
+            self.cache.put(key, maze)
+            future.set_result(maze)
+            return maze
+        except Exception as err:
+            future.set_exception(err)
+            future.exception()  # Nobody else might be waiting, don't log it as never retrieved
+            raise
+        finally:
+            del self.loading[key]
+
+    def resolve(self, maze_id: str) -> str:
+        file_name = os.path.realpath(os.path.join(self.maze_dir, maze_id))
+        if not file_name.startswith(self.maze_dir + os.sep):
+            raise ValueError(f"Maze {maze_id} is outside of the maze directory.")
+        return file_name
+
+    async def load(self, maze_id: str) -> Dict[str, Any]:
+        maze = await self.get_maze(maze_id)
+        return {"maze_id": maze_id, "size_x": maze.size_x, "size_y": maze.size_y, "load_time": maze.load_time}
+
+    async def solve(self, maze_id: str, start: Optional[List[int]] = None, end: Optional[List[int]] = None,
+                    algorithm: str = "a-star", path: bool = True) -> Dict[str, Any]:
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm: {algorithm}")
+        start = tuple(start) if start else None
+        end = tuple(end) if end else None
+        loop = asyncio.get_running_loop()
+        # Impossible pairs are answered right away, without moving END in a copy of the maze. The searches skip this
+        # check, a copy with a moved END has no connectivity index.
+        base = await self.get_maze(maze_id)
+        if not await loop.run_in_executor(self.executor, endpoints_connected, base, start, end):
+            result = {"solved": False, "path_length": 0, "nodes_expanded": 0, "elapsed": 0.0}
+            if path:
+                result["path"] = []
+            return result
+        maze = await self.get_maze(maze_id, end) if end is not None else base
+        # Every solver works on its own state layer, so requests for the same maze can run at the same time
+        return await loop.run_in_executor(self.executor, solve_maze, maze, algorithm, path, start)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mazes": len(self.cache.mazes), "memory": self.cache.memory(), "budget": self.cache.budget,
+                "hits": self.cache.hits, "misses": self.cache.misses}
+
+
+def solve_maze(maze: Maze, algorithm: str, path: bool = True, start: Optional[Position] = None) -> Dict[str, Any]:
+    # Solve from the START cell of the maze or from the given position
+    solver = BaseSolver(maze)
+    if start is not None:
+        cell_index(maze, start)  # Raises on walls and positions outside of the maze
+        pos_x, pos_y = start
+    else:
+        pos_x, pos_y = solver.find_start()
+    started = perf_counter()
+    try:
+        solved = solver.run_algorithm(algorithm, pos_x, pos_y)
+    finally:
+        solver.release()
+    result = {"solved": solved, "path_length": solver.path_length, "nodes_expanded": solver.nodes_expanded,
+              "elapsed": perf_counter() - started}
+    if path and solved:
+        result["path"] = [maze.position(i) for i in solver.state.path(maze.index(pos_x, pos_y))]
+    return result
+
+
+async def serve_forever(server: MazeServer, socket_path: Optional[str] = None, host: str = "127.0.0.1",
+                        port: int = 8765) -> None:
+    if socket_path:
+        listener = await asyncio.start_unix_server(server.handle_client, path=socket_path)
+        address = socket_path
+    else:
+        listener = await asyncio.start_server(server.handle_client, host=host, port=port)
+        address = f"{host}:{port}"
+    msg = f"Serving mazes from {server.maze_dir} on {address}."
+    logging.info(msg)
+    print(msg, flush=True)
+    async with listener:
+        await listener.serve_forever()
+
+
+def serve(maze_dir: str, socket_path: Optional[str] = None, host: str = "127.0.0.1", port: int = 8765,
+          workers: Optional[int] = None, cache_budget: int = 256 << 20) -> None:
+    server = MazeServer(maze_dir, cache_budget, workers)
+    try:
+        asyncio.run(serve_forever(server, socket_path, host, port))
+    except KeyboardInterrupt:
+        logging.info("Server stopped.")
+    finally:
+        server.executor.shutdown(wait=False, cancel_futures=True)
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
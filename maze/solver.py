@@ -1,142 +1,669 @@
-import copy
-from threading import Thread
-from time import sleep
+import logging
+from array import array
+from collections import deque
+from heapq import heappop, heappush
+from time import monotonic
+from typing import TYPE_CHECKING, Any, Callable, Dict, Generator, Iterator, List, Optional, Tuple, TypeVar
 
-from maze.gui import Gui
-from maze.maze import MazeCell
+from maze.connectivity import build_connectivity
+from maze.distance import get_distance_field
+from maze.incremental import INFINITY, LPAStar
+from maze.junction import JunctionGraph, get_junction_graph
+from maze.maze import Maze, MazeCell
+from maze.metrics import SolverMetrics
+from maze.state import SolverState
+from maze.wavefront import Wavefront, numpy, set_cells
 
+if TYPE_CHECKING:
+    from maze.trace import TraceRecorder
 
-class Pos:
-    x: int
-    y: int
+# A heuristic is created for a maze and estimates the remaining steps from a cell index to the nearest END cell
+Heuristic = Callable[[Maze], Callable[[int], int]]
 
-    def __init__(self, x: int, y: int):
-        self.x = x
-        self.y = y
+# Searches are generators yielding after every step (a cell expanded or a cell of the path marked) and returning
+# whether a path was found. The Gui advances them a few steps per frame, anyone else runs them to the end at once.
+Search = Generator[None, None, bool]
 
+WAIT = "wait"  # Yielded by a Solver instead of a step while it has nothing to do, e.g. in between two algorithms
+BUILD_SLICE = 0.02  # Seconds a Solver spends building the connectivity index before it lets the Gui draw a frame
 
-class Solver(Thread):
-    gui: Gui  # Reference to Gui object
-    delay: float  # Delay between Maze updates in seconds
+T = TypeVar("T")
 
-    def __init__(self, gui: Gui, delay: float, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.gui = gui
-        self.delay = delay
 
-    def run(self) -> None:
-        # Initial delay
-        sleep(1.0)
-
-        # Keep a backup so the second algorithm can start on a fresh copy
-        orig_maze = copy.deepcopy(self.gui.maze)
-
-        # Find starting position for recursive search
-        pos_x = -1
-        pos_y = -1
-        for y in range(self.gui.maze.size_y):
-            for x in range(self.gui.maze.size_x):
-                if self.gui.maze.get_field(x, y) == MazeCell.START.value:
-                    pos_x = x
-                    pos_y = y
-                    break
-        if pos_x == -1:
-            raise RuntimeError("No START maze cell found")
+def complete(steps: Generator[Any, Any, T]) -> T:
+    # Run a search to its end and return its result
+    while True:
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return stop.value
 
-        # Run recursive search
-        solved = self.solve_recursive(pos_x, pos_y)
-        if not self.gui.running:
-            return
-        if solved:
-            print("Solved")
-        else:
-            print("No solution found")
-
-        # Some delay in between the two algorithms
-        sleep(5.0)
-
-        # Run the BFS
-        self.gui.maze = copy.deepcopy(orig_maze)
-        solved = self.solve_breadth_first(pos_x, pos_y)
-        if not self.gui.running:
-            return
-        if solved:
-            print("Solved")
-        else:
-            print("No solution found")
+
+def manhattan_heuristic(maze: Maze) -> Callable[[int], int]:
+    ends = [maze.position(i) for i in maze.find_cells(MazeCell.END.value)]
+    stride = maze.stride
+
+    def estimate(index: int) -> int:
+        row, col = divmod(index, stride)
+        return min((abs(col - 1 - x) + abs(row - 1 - y) for x, y in ends), default=0)
+
+    return estimate
+
+
+class BaseSolver:
+    maze: Maze  # Maze to solve, its layout is only read
+    state: Optional[SolverState]  # State layer of the current (or last) search on top of the maze
+    trace: Optional["TraceRecorder"]  # Records the state changes of every search if set
+    nodes_expanded: int  # Number of cells expanded by the last search
+    path_length: int  # Number of steps from START to END found by the last search (0 if not solved)
+    frontier_peak: int  # Maximum size of the frontier (queue, stack or heap) during the last search
+    collect_metrics: bool  # Collect SolverMetrics for every search() run, off by default as it costs time
+    metrics: Optional[SolverMetrics]  # Metrics of the current (or last) run, None if not collected
+    runs: List[SolverMetrics]  # Metrics of all runs so far
+    planner: Optional[LPAStar]  # Planner of the last lpa-star search, keeps following layout changes of the maze
+    path_cells: List[int]  # Cells of the path planned last by the planner
+
+    def __init__(self, maze: Maze, trace: Optional["TraceRecorder"] = None, collect_metrics: bool = False) -> None:
+        self.maze = maze
+        self.state = None
+        self.trace = trace
+        self.collect_metrics = collect_metrics
+        self.metrics = None
+        self.runs = []
+        self.planner = None
+        self.path_cells = []
+        self.reset_statistics()
+
+    def reset_statistics(self) -> None:
+        self.nodes_expanded = 0
+        self.path_length = 0
+        self.frontier_peak = 0
+
+    def new_state(self, start: Optional[int] = None) -> SolverState:
+        # Every search starts with fresh statistics and an empty state layer, the maze itself is never copied.
+        # Searches may start anywhere: A start cell other than the START cell of the maze is marked as START in the
+        # layer, so it is not discovered again, while START cells of the maze other than the start cell count as FREE.
+        self.reset_statistics()
+        self.release()
+        self.state = SolverState(self.maze, self.trace)
+        if start is not None and self.maze.grid[start] != MazeCell.START.value:
+            self.state.set_cell(start, MazeCell.START.value)
+        return self.state
+
+    def release(self) -> None:
+        # Stop following layout changes of the maze (see search_lpa_star()). Anyone running a search just once must
+        # call this when done, otherwise the maze keeps the planner alive.
+        if self.planner is not None:
+            self.maze.layout_listeners.remove(self.planner.cell_changed)
+            self.planner = None
+
+    def run_algorithm(self, name: str, x: int, y: int) -> bool:
+        # Run an algorithm by name (see ALGORITHMS) to its end
+        return complete(self.search(name, x, y))
+
+    def search(self, name: str, x: int, y: int) -> Search:
+        # Step through an algorithm by name, timed and counted if metrics are collected
+        if not self.collect_metrics:
+            return (yield from self._search(name, x, y))
+        metrics = SolverMetrics(name, self.maze.load_time)
+        self.metrics = metrics
+        # Only the time spent in the search counts, not the time in between two of its steps
+        metrics.start("solve")
+        steps = self._search(name, x, y)
+        while True:
+            try:
+                next(steps)
+            except StopIteration as stop:
+                solved = stop.value
+                break
+            metrics.pause()
+            yield
+            metrics.resume()
+        metrics.stop()
+        metrics.solved = solved
+        metrics.nodes_expanded = self.nodes_expanded
+        metrics.frontier_peak = self.frontier_peak
+        metrics.cells_written = self.state.writes if self.state is not None else 0
+        metrics.path_length = self.path_length
+        self.runs.append(metrics)
+        return solved
+
+    def _search(self, name: str, x: int, y: int) -> Search:
+        # Skip the search if the connectivity index of the maze tells that no END cell can be reached at all. It is
+        # only consulted if someone built it already, building it just for one search costs more than the search.
+        # Incremental algorithms run anyway, they keep following layout changes that might connect START and END.
+        connectivity = self.maze.connectivity
+        if (name not in INCREMENTAL_ALGORITHMS and connectivity is not None and
+                not connectivity.reaches_end(self.maze.index(x, y))):
+            self.new_state()
+            logging.info(f"Skipped {name}, no END cell can be reached in {self.maze.file_name}.")
+            return False
+        return (yield from ALGORITHMS[name](self, x, y))
+
+    def _phase(self, name: str) -> None:
+        # Time the next phase of the current run, nothing to do if metrics are not collected (or the run is over)
+        if self.metrics is not None and self.metrics.phase is not None:
+            self.metrics.start(name)
+
+    def find_start(self) -> Tuple[int, int]:
+        i = self.maze.grid.find(bytes([MazeCell.START.value]))
+        if i == -1:
+            raise RuntimeError("No START maze cell found")
+        return self.maze.position(i)
 
     def solve_breadth_first(self, x: int, y: int) -> bool:
-        sleep(self.delay)
-        if self.gui.maze.get_field(x, y) == MazeCell.END.value:
+        return complete(self.search_breadth_first(x, y))
+
+    def solve_depth_first(self, x: int, y: int) -> bool:
+        return complete(self.search_depth_first(x, y))
+
+    def solve_a_star(self, x: int, y: int, heuristic: Optional[Heuristic] = None) -> bool:
+        return complete(self.search_a_star(x, y, heuristic))
+
+    def solve_bidirectional(self, x: int, y: int) -> bool:
+        return complete(self.search_bidirectional(x, y))
+
+    def solve_distance_field(self, x: int, y: int) -> bool:
+        return complete(self.search_distance_field(x, y))
+
+    def solve_wavefront(self, x: int, y: int) -> bool:
+        return complete(self.search_wavefront(x, y))
+
+    def solve_junction_graph(self, x: int, y: int) -> bool:
+        return complete(self.search_junction_graph(x, y))
+
+    def solve_lpa_star(self, x: int, y: int) -> bool:
+        return complete(self.search_lpa_star(x, y))
+
+    def search_breadth_first(self, x: int, y: int) -> Search:
+        state = self.new_state(self.maze.index(x, y))
+        if self.maze.get_field(x, y) == MazeCell.END.value:
             return True
-        height = self.gui.maze.size_y
-        width = len(self.gui.maze.cells[0])
-        start = Pos(x, y)
-        heads = [start]
-        parents = {(x, y): None}
-        while len(heads) > 0 and self.gui.running:
-            sleep(self.delay * 4)
-            for h in heads:
-                sleep(self.delay)
-                if self.gui.maze.get_field(h.x, h.y) == MazeCell.HEAD.value:
-                    self.gui.maze.set_field(h.x, h.y, MazeCell.VISITED)
-                for p in [Pos(h.x - 1, h.y), Pos(h.x + 1, h.y), Pos(h.x, h.y - 1), Pos(h.x, h.y + 1)]:
-                    if 0 <= p.x < width and 0 <= p.y < height:
-                        if self.gui.maze.get_field(p.x, p.y) == MazeCell.END.value:
-                            # Found "End", plot path
-                            parents[(p.x, p.y)] = h
-                            current = p
-                            while parents[(current.x, current.y)] is not None:
-                                current = parents[(current.x, current.y)]
-                                if self.gui.maze.cells[current.y][current.x] != MazeCell.START.value:
-                                    self.gui.maze.cells[current.y][current.x] = MazeCell.PATH.value
-                                    sleep(self.delay)
-                            return True
-                        if self.gui.maze.get_field(p.x, p.y) == MazeCell.FREE.value:
-                            self.gui.maze.set_field(p.x, p.y, MazeCell.HEAD)
-                            heads.append(p)
-                            parents[(p.x, p.y)] = h  # Track its parent
-                heads.remove(h)
+        grid = self.maze.grid
+        offsets = self.maze.offsets
+        cells = state.cells
+        set_cell = state.set_cell
+        free, end, head, visited, path = (MazeCell.FREE.value, MazeCell.END.value, MazeCell.HEAD.value,
+                                          MazeCell.VISITED.value, MazeCell.PATH.value)
+        start_value = MazeCell.START.value
+        start = self.maze.index(x, y)
+        heads = deque([start])
+        parents = array("i", [-1]) * len(grid)  # Parent cell index of every discovered cell
+        parents[start] = start
+        expanded = 0
+        while heads:
+            self.frontier_peak = max(self.frontier_peak, len(heads))
+            # Expand the current level, cells discovered meanwhile are appended for the next one
+            for _ in range(len(heads)):
+                h = heads.popleft()
+                expanded += 1
+                if cells[h] == head:
+                    set_cell(h, visited)
+                for offset in offsets:
+                    p = h + offset
+                    val = grid[p] or cells[p]
+                    if val == start_value and p != start:
+                        val = cells[p] or free
+                    if val == free:
+                        set_cell(p, head)
+                        heads.append(p)
+                        parents[p] = h  # Track its parent
+                    elif val == end:
+                        # Found "End", plot path
+                        self._phase("reconstruct")
+                        self.nodes_expanded = expanded
+                        self.path_length = 1
+                        current = h
+                        while current != start:
+                            set_cell(current, path)
+                            self.path_length += 1
+                            yield
+                            current = parents[current]
+                        return True
+                yield
+        self.nodes_expanded = expanded
         return False
 
-    def solve_recursive(self, x: int, y: int) -> bool:
-        if not self.gui.running:
+    def search_depth_first(self, x: int, y: int) -> Search:
+        # Iterative DFS on an explicit stack, colors cells just like a recursive DFS would
+        self.new_state(self.maze.index(x, y))
+        if self.maze.get_field(x, y) == MazeCell.END.value:
+            return True
+        grid = self.maze.grid
+        offsets = self.maze.offsets
+        goto = (MazeCell.FREE.value, MazeCell.START.value, MazeCell.END.value)
+        start = self.maze.index(x, y)
+        visited = bytearray(len(grid))
+        visited[start] = 1
+        self._enter(start)
+        stack = [start]  # Cells on the current path from START
+        tried = [0]  # Number of neighbors already tried for each cell on the stack
+        self.frontier_peak = 1
+        while stack:
+            i = stack[-1]
+            k = tried[-1]
+            if k < 4:
+                tried[-1] = k + 1
+                n = i + offsets[k]
+                # No bounds checks needed, the grid is surrounded by walls
+                if visited[n] or grid[n] not in goto:
+                    continue
+                if grid[n] == MazeCell.END.value:
+                    # Found "End", plot path back to START
+                    self._phase("reconstruct")
+                    self.path_length = len(stack)
+                    for cell in reversed(stack[1:]):
+                        self.state.set_cell(cell, MazeCell.PATH.value)
+                        yield
+                    return True
+                visited[n] = 1
+                self._enter(n)
+                stack.append(n)
+                tried.append(0)
+                if len(stack) > self.frontier_peak:
+                    self.frontier_peak = len(stack)
+            else:
+                # Dead end, backtrack
+                stack.pop()
+                tried.pop()
+                if self.state.cells[i] == MazeCell.HEAD.value:
+                    self.state.set_cell(i, MazeCell.VISITED.value)
+            yield
+        return False
+
+    def search_a_star(self, x: int, y: int, heuristic: Optional[Heuristic] = None) -> Search:
+        # A* with unit step costs, by default guided by the Manhattan distance to the nearest END cell
+        state = self.new_state(self.maze.index(x, y))
+        if self.maze.get_field(x, y) == MazeCell.END.value:
+            return True
+        estimate = (heuristic if heuristic is not None else manhattan_heuristic)(self.maze)
+        grid = self.maze.grid
+        offsets = self.maze.offsets
+        cells = state.cells
+        set_cell = state.set_cell
+        free, end, head, visited = MazeCell.FREE.value, MazeCell.END.value, MazeCell.HEAD.value, MazeCell.VISITED.value
+        start_value = MazeCell.START.value
+        start = self.maze.index(x, y)
+        parents = array("i", [-1]) * len(grid)
+        costs = array("i", [0]) * len(grid)  # Number of steps from START of every discovered cell
+        parents[start] = start
+        h_start = estimate(start)
+        heads = [(h_start, h_start, start)]  # Heap of (f = g + h, h, cell), ties are broken towards the goal
+        expanded = 0
+        peak = 0
+        while heads:
+            if len(heads) > peak:
+                peak = len(heads)
+            _, _, i = heappop(heads)
+            if cells[i] == visited:
+                continue  # Outdated heap entry
+            expanded += 1
+            if cells[i] == head:
+                set_cell(i, visited)
+            cost = costs[i] + 1
+            for offset in offsets:
+                n = i + offset
+                val = grid[n] or cells[n]
+                if val == start_value and n != start:
+                    val = cells[n] or free
+                if val == end:
+                    # Expanded cells come in order of f, so this is a shortest path
+                    self.nodes_expanded = expanded
+                    self.frontier_peak = peak
+                    self.path_length = cost
+                    self._phase("reconstruct")
+                    yield from self._plot_path(i, parents)
+                    return True
+                if val == free or (val == head and cost < costs[n]):
+                    if val == free:
+                        set_cell(n, head)
+                    costs[n] = cost
+                    parents[n] = i
+                    h = estimate(n)
+                    heappush(heads, (cost + h, h, n))
+            yield
+        self.nodes_expanded = expanded
+        self.frontier_peak = peak
+        return False
+
+    def search_bidirectional(self, x: int, y: int) -> Search:
+        # BFS from START and from all END cells at once, always growing the smaller frontier by one level
+        state = self.new_state(self.maze.index(x, y))
+        if self.maze.get_field(x, y) == MazeCell.END.value:
+            return True
+        grid = self.maze.grid
+        offsets = self.maze.offsets
+        cells = state.cells
+        set_cell = state.set_cell
+        end, head, visited, wall = MazeCell.END.value, MazeCell.HEAD.value, MazeCell.VISITED.value, MazeCell.WALL.value
+        start = self.maze.index(x, y)
+        ends = self.maze.find_cells(end)
+        if not ends:
             return False
-        sleep(self.delay)
-        if self.gui.maze.get_field(x, y) == MazeCell.END.value:
+        parents = array("i", [-1]) * len(grid)
+        depths = array("i", [0]) * len(grid)  # Number of steps from the side's origin
+        sides = bytearray(len(grid))  # 0: Not discovered, 1: Discovered from START, 2: Discovered from an END
+        parents[start] = start
+        sides[start] = 1
+        for i in ends:
+            parents[i] = i
+            sides[i] = 2
+        frontiers = {1: deque([start]), 2: deque(ends)}
+        expanded = 0
+        while frontiers[1] and frontiers[2]:
+            self.frontier_peak = max(self.frontier_peak, len(frontiers[1]) + len(frontiers[2]))
+            side = 1 if len(frontiers[1]) <= len(frontiers[2]) else 2
+            heads = frontiers[side]
+            # Finish the whole level, the first meeting point is not necessarily the best one
+            meeting = None
+            for _ in range(len(heads)):
+                h = heads.popleft()
+                expanded += 1
+                if cells[h] == head:
+                    set_cell(h, visited)
+                for offset in offsets:
+                    n = h + offset
+                    if sides[n] == 0:
+                        if grid[n] != wall:
+                            set_cell(n, head)
+                            sides[n] = side
+                            depths[n] = depths[h] + 1
+                            parents[n] = h
+                            heads.append(n)
+                    elif sides[n] != side:
+                        length = depths[h] + 1 + depths[n]
+                        if meeting is None or length < meeting[0]:
+                            meeting = (length, h, n) if side == 1 else (length, n, h)
+                yield
+            if meeting is not None:
+                self.nodes_expanded = expanded
+                length, forward, backward = meeting
+                self.path_length = length
+                self._phase("reconstruct")
+                yield from self._plot_path(forward, parents)
+                yield from self._plot_path(backward, parents)
+                return True
+        self.nodes_expanded = expanded
+        return False
+
+    def search_wavefront(self, x: int, y: int) -> Search:
+        # Breadth-first search vectorized with NumPy, one step per layer of cells at the same distance from START.
+        # Without NumPy it is the plain breadth-first search.
+        if numpy is None:
+            logging.info("NumPy is not installed, running breadth-first instead of wavefront.")
+            return (yield from self.search_breadth_first(x, y))
+        state = self.new_state(self.maze.index(x, y))
+        if self.maze.get_field(x, y) == MazeCell.END.value:
             return True
-        if self.gui.maze.get_field(x, y) == MazeCell.FREE.value:
-            self.gui.maze.set_field(x, y, MazeCell.HEAD)
-        goto = [MazeCell.FREE.value, MazeCell.END.value]
-        if x > 0 and self.gui.maze.cells[y][x - 1] in goto:
-            solved = self.solve_recursive(x - 1, y)
-            if solved:
-                if self.gui.maze.get_field(x, y) != MazeCell.START.value:
-                    self.gui.maze.set_field(x, y, MazeCell.PATH)
-                    sleep(self.delay)
-                return solved
-        if x < self.gui.maze.size_x - 1 and self.gui.maze.cells[y][x + 1] in goto:
-            solved = self.solve_recursive(x + 1, y)
-            if solved:
-                if self.gui.maze.get_field(x, y) != MazeCell.START.value:
-                    self.gui.maze.set_field(x, y, MazeCell.PATH)
-                    sleep(self.delay)
-                return solved
-        if y > 0 and self.gui.maze.cells[y - 1][x] in goto:
-            solved = self.solve_recursive(x, y - 1)
-            if solved:
-                if self.gui.maze.get_field(x, y) != MazeCell.START.value:
-                    self.gui.maze.set_field(x, y, MazeCell.PATH)
-                    sleep(self.delay)
-                return solved
-        if y < self.gui.maze.size_y - 1 and self.gui.maze.cells[y + 1][x] in goto:
-            solved = self.solve_recursive(x, y + 1)
-            if solved:
-                if self.gui.maze.get_field(x, y) != MazeCell.START.value:
-                    self.gui.maze.set_field(x, y, MazeCell.PATH)
-                    sleep(self.delay)
-                return solved
-        if self.gui.maze.get_field(x, y) == MazeCell.HEAD.value:
-            self.gui.maze.set_field(x, y, MazeCell.VISITED)
-            sleep(self.delay)
+        wavefront = Wavefront(self.maze, self.maze.index(x, y))
+        while len(wavefront.frontier) and wavefront.end == -1:
+            self.frontier_peak = max(self.frontier_peak, len(wavefront.frontier))
+            layer, depth = wavefront.frontier, wavefront.depth
+            wavefront.grow()
+            if depth > 0:
+                set_cells(state, layer, MazeCell.VISITED.value)  # Any layer but START itself
+            if wavefront.end == -1:
+                set_cells(state, wavefront.frontier, MazeCell.HEAD.value)
+            yield
+        self.nodes_expanded = wavefront.expanded
+        if wavefront.end == -1:
+            return False
+        self._phase("reconstruct")
+        path = wavefront.path()
+        self.path_length = len(path) - 1
+        for i in path[1:-1]:
+            state.set_cell(i, MazeCell.PATH.value)
+            yield
+        return True
+
+    def search_distance_field(self, x: int, y: int) -> Search:
+        # Follow the distance field of all END cells, it is built once per maze layout and reused afterwards
+        state = self.new_state(self.maze.index(x, y))
+        if self.maze.get_field(x, y) == MazeCell.END.value:
+            return True
+        field = get_distance_field(self.maze)
+        if field.uses == 1:
+            # Building the field is the search, a field built before is reused for free
+            self.nodes_expanded = field.expanded
+            self.frontier_peak = field.queue_peak
+        self._phase("reconstruct")
+        path = field.path_indices(self.maze.index(x, y))
+        if path is None:
+            return False
+        self.path_length = len(path) - 1
+        for i in path[1:-1]:
+            state.set_cell(i, MazeCell.PATH.value)
+            yield
+        return True
+
+    def search_junction_graph(self, x: int, y: int) -> Search:
+        # A* on the junction graph of the maze, built once per maze layout: Only junctions and END cells are expanded,
+        # the corridors in between are single weighted edges. The path is expanded back to cells once found.
+        state = self.new_state(self.maze.index(x, y))
+        if self.maze.get_field(x, y) == MazeCell.END.value:
+            return True
+        graph = get_junction_graph(self.maze)
+        estimate = manhattan_heuristic(self.maze)
+        grid = self.maze.grid
+        nodes, targets, lengths, exits = graph.nodes, graph.targets, graph.lengths, graph.exits
+        cells = state.cells
+        set_cell = state.set_cell
+        free, end, head, visited = MazeCell.FREE.value, MazeCell.END.value, MazeCell.HEAD.value, MazeCell.VISITED.value
+        start_value = MazeCell.START.value
+        start = self.maze.index(x, y)
+        costs = array("i", [INFINITY]) * len(nodes)  # Number of steps from START of every discovered node
+        parent_cells = array("i", [-1]) * len(nodes)  # Cell the edge to a node was taken from (a node or START)
+        parent_directions = array("b", [-1]) * len(nodes)  # Direction of that edge, -1 if the node is START itself
+        done = bytearray(len(nodes))
+        heads = []
+        for node, steps, k in graph.attach(grid, start):
+            if steps < costs[node]:
+                costs[node] = steps
+                parent_cells[node] = start
+                parent_directions[node] = k
+                h = estimate(nodes[node])
+                heappush(heads, (steps + h, h, node))
+        expanded = 0
+        peak = 0
+        while heads:
+            if len(heads) > peak:
+                peak = len(heads)
+            _, _, node = heappop(heads)
+            if done[node]:
+                continue  # Outdated heap entry
+            done[node] = 1
+            expanded += 1
+            i = nodes[node]
+            if grid[i] == end:
+                self.nodes_expanded = expanded
+                self.frontier_peak = peak
+                self.path_length = costs[node]
+                self._phase("reconstruct")
+                yield from self._plot_corridors(graph, node, parent_cells, parent_directions)
+                return True
+            if grid[i] == free and cells[i] != start_value:  # Keep the START mark of a start cell (see new_state())
+                set_cell(i, visited)
+            for k in range(4):
+                target = targets[4 * node + k]
+                # Dead ends other than END cells lead nowhere, they are never queued
+                if target == -1 or done[target] or (exits[target] == 1 and grid[nodes[target]] != end):
+                    continue
+                cost = costs[node] + lengths[4 * node + k]
+                if cost < costs[target]:
+                    if costs[target] == INFINITY and grid[nodes[target]] == free:
+                        set_cell(nodes[target], head)
+                    costs[target] = cost
+                    parent_cells[target] = i
+                    parent_directions[target] = k
+                    h = estimate(nodes[target])
+                    heappush(heads, (cost + h, h, target))
+            yield
+        self.nodes_expanded = expanded
+        self.frontier_peak = peak
         return False
+
+    def search_lpa_star(self, x: int, y: int) -> Search:
+        # Incremental search (LPA*) from all END cells, call replan() after WALL/FREE cells flipped to repair the path
+        self.new_state(self.maze.index(x, y))
+        if self.maze.get_field(x, y) == MazeCell.END.value:
+            return True
+        self.planner = LPAStar(self.maze, self.maze.index(x, y))
+        self.path_cells = []
+        self.maze.layout_listeners.append(self.planner.cell_changed)
+        return (yield from self._plan())
+
+    def replan(self) -> Optional[bool]:
+        # Repair the path of the last lpa-star search after layout changes, None if nothing changed since
+        return complete(self.search_replan())
+
+    def search_replan(self) -> Generator[None, None, Optional[bool]]:
+        if self.planner is None or not self.planner.apply_changes():
+            return None
+        return (yield from self._plan())
+
+    def _plan(self) -> Search:
+        # Expanded cells are marked as VISITED, the path found before is replaced by the new one
+        state = self.state
+        cells = state.cells
+        grid = self.maze.grid
+        free, visited, path = MazeCell.FREE.value, MazeCell.VISITED.value, MazeCell.PATH.value
+        start = MazeCell.START.value
+
+        def expand(i: int) -> None:
+            # Cells of the old path become VISITED, the START mark of a start cell is kept (see new_state())
+            if grid[i] == free and cells[i] != visited and cells[i] != start:
+                state.set_cell(i, visited)
+
+        solved = yield from self.planner.compute(expand)
+        self.nodes_expanded = self.planner.expanded
+        self.frontier_peak = self.planner.queue_peak
+        self._phase("reconstruct")
+        for i in self.path_cells:
+            if cells[i] == path:
+                state.set_cell(i, visited)
+        self.path_cells = self.planner.path()
+        self.path_length = max(0, len(self.path_cells) - 1)
+        for i in self.path_cells[1:-1]:
+            state.set_cell(i, path)
+            yield
+        return solved
+
+    def _plot_path(self, i: int, parents: array) -> Iterator[None]:
+        # Walk the parents from cell i back to the root of its search tree (a cell being its own parent)
+        # and mark every cell on the way as PATH, except START and END
+        while True:
+            if self.state.cells[i] in (MazeCell.HEAD.value, MazeCell.VISITED.value):
+                self.state.set_cell(i, MazeCell.PATH.value)
+                yield
+            if parents[i] == i:
+                break
+            i = parents[i]
+
+    def _plot_corridors(self, graph: JunctionGraph, node: int, parent_cells: array,
+                        parent_directions: array) -> Iterator[None]:
+        # Walk the edges from a node of the junction graph back to START and mark the cells of their corridors as PATH
+        grid = self.maze.grid
+        while parent_directions[node] != -1:
+            cell = parent_cells[node]
+            for i in graph.corridor(grid, cell, parent_directions[node]):
+                if grid[i] != MazeCell.END.value:
+                    self.state.set_cell(i, MazeCell.PATH.value)
+                    yield
+            if graph.node_ids[cell] == -1:
+                break  # START, somewhere in a corridor
+            node = graph.node_ids[cell]
+
+    def _enter(self, i: int) -> None:
+        self.nodes_expanded += 1
+        if self.maze.grid[i] == MazeCell.FREE.value and not self.state.cells[i]:
+            self.state.set_cell(i, MazeCell.HEAD.value)
+
+
+# Searches by name, as selected with --algorithm
+ALGORITHMS: Dict[str, Callable[[BaseSolver, int, int], Search]] = {
+    "depth-first": BaseSolver.search_depth_first,
+    "breadth-first": BaseSolver.search_breadth_first,
+    "a-star": BaseSolver.search_a_star,
+    "bidirectional": BaseSolver.search_bidirectional,
+    "wavefront": BaseSolver.search_wavefront,
+    "distance-field": BaseSolver.search_distance_field,
+    "junction-graph": BaseSolver.search_junction_graph,
+    "lpa-star": BaseSolver.search_lpa_star,
+}
+DEFAULT_ALGORITHMS = ["depth-first", "breadth-first"]
+INCREMENTAL_ALGORITHMS = {"lpa-star"}  # Algorithms that can still find a path after the layout of the maze changed
+
+
+class Solver(BaseSolver):
+    algorithms: List[str]  # Names of the algorithms to run one after another
+    steps: Iterator[Optional[str]]  # Steps of all runs, advanced by the Gui from its main loop (no thread involved)
+    waiting: bool  # Whether the last step was WAIT
+    building: Optional[Iterator[None]]  # Build of the connectivity index, advanced only while the solver waits
+
+    def __init__(self, maze: Maze, algorithms: Optional[List[str]] = None, collect_metrics: bool = False) -> None:
+        super().__init__(maze, collect_metrics=collect_metrics)
+        self.algorithms = algorithms if algorithms else DEFAULT_ALGORITHMS
+        self.steps = self.run()
+        self.waiting = True
+        self.building = build_connectivity(maze)
+
+    def advance(self, count: float, until: Optional[float] = None) -> None:
+        # Take up to count steps (math.inf for no limit), fewer if the solver is waiting, done or the monotonic() time
+        # until passed. Waiting takes no steps: A waiting solver is resumed on every call, even for count 0, so it may
+        # take one step early when it is done waiting.
+        if count <= 0 and not self.waiting:
+            return
+        for step in self.steps:
+            self.waiting = step is WAIT
+            if self.waiting:
+                return
+            count -= 1
+            if count <= 0 or (until is not None and monotonic() >= until):
+                return
+
+    def wait(self, seconds: float) -> Iterator[str]:
+        # Wait, building the connectivity index meanwhile in slices of BUILD_SLICE seconds so the Gui keeps drawing
+        # frames. The index lets the algorithms skip a maze without solution at once, but they never wait for it: A
+        # build taking longer (huge mazes) goes on in the next wait, in between two algorithms.
+        until = monotonic() + seconds
+        while monotonic() < until:
+            if self.building is not None:
+                slice_until = min(until, monotonic() + BUILD_SLICE)
+                for _ in self.building:
+                    if monotonic() >= slice_until:
+                        break
+                else:
+                    self.building = None
+            yield WAIT
+
+    def run(self) -> Iterator[Optional[str]]:
+        # Initial delay
+        yield from self.wait(1.0)
+
+        # Find starting position
+        pos_x, pos_y = self.find_start()
+
+        for n, name in enumerate(self.algorithms):
+            if n > 0:
+                # Some delay in between the algorithms, the next one starts on a fresh state layer
+                yield from self.wait(5.0)
+            solved = yield from self.search(name, pos_x, pos_y)
+            if solved:
+                print("Solved")
+            else:
+                print("No solution found")
+            if self.metrics is not None:
+                print(self.metrics)
+        if self.building is not None:
+            # Unfinished, stop it from following layout changes
+            self.building.close()
+            self.building = None
+
+        # Keep the path of an incremental search up to date while walls are toggled in the Gui
+        while self.planner is not None:
+            solved = yield from self.search_replan()
+            if solved is None:
+                yield WAIT
+            else:
+                print("Replanned (%d cells expanded): %s" % (self.nodes_expanded,
+                                                             "Solved" if solved else "No solution found"))
@@ -0,0 +1,89 @@
+import logging
+from collections import deque
+from typing import TYPE_CHECKING, List, Optional
+
+from maze.maze import ChangeTracker, Maze, MazeCell
+
+if TYPE_CHECKING:
+    from maze.trace import TraceRecorder
+
+# Maps FREE cells to all bits set and any other cell to 0
+FREE_MASK_TABLE = bytes([255]) + bytes(255)
+
+
+class SolverState(ChangeTracker):
+    maze: Maze  # Static layout shared by all runs, never changed by a solver
+    # Per-run layer over the grid of the maze (same indices): PATH, VISITED or HEAD for every cell touched by the
+    # run, 0 for all others. States are only shown on FREE cells, e.g. a wall added later hides the state below it.
+    cells: bytearray
+    trace: Optional["TraceRecorder"]  # Records every change of a cell if set
+    writes: int  # Number of state changes so far
+    log_changes: bool  # Log every change (verbose and DEBUG level), decided once as it is far too slow otherwise
+
+    def __init__(self, maze: Maze, trace: Optional["TraceRecorder"] = None) -> None:
+        self.maze = maze
+        self.cells = bytearray(len(maze.grid))
+        self.dirty = None
+        self.trace = trace
+        self.writes = 0
+        self.log_changes = maze.verbose > 0 and logging.getLogger().isEnabledFor(logging.DEBUG)
+
+    def set_cell(self, index: int, value: int) -> None:
+        # Fast path for solvers working on grid indices, the value is expected to be a valid MazeCell value
+        if self.log_changes:
+            col, row = self.maze.position(index)
+            logging.debug("Set state at (row=%d, col=%d) to %s (val=%d).", row, col, MazeCell(value).name, value)
+        self.cells[index] = value
+        self.writes += 1
+        if self.dirty is not None:
+            self.dirty.append(index)
+        if self.trace is not None:
+            self.trace.record(index, value)
+
+    def get_cell(self, index: int) -> int:
+        # Value of a cell as displayed: Its layout unless it is FREE (0), its state otherwise
+        return self.maze.grid[index] or self.cells[index]
+
+    def get_field(self, col: int, row: int) -> int:
+        self.maze._check_bounds(col, row)  # Raises IndexError() on Out-of-Bounds error
+        return self.get_cell(self.maze.index(col, row))
+
+    def path(self, start: int) -> List[int]:
+        # Indices of a path from start to the nearest END cell over the PATH cells of the layer (both ends included),
+        # empty if there is none. Solvers finding shortest paths mark exactly one, for others it may be shorter.
+        grid = self.maze.grid
+        cells = self.cells
+        path_value, end = MazeCell.PATH.value, MazeCell.END.value
+        if grid[start] == end:
+            return [start]
+        parents = {start: start}
+        heads = deque([start])
+        while heads:
+            h = heads.popleft()
+            for offset in self.maze.offsets:
+                n = h + offset
+                if n in parents:
+                    continue
+                if grid[n] == end:
+                    path = [n]
+                    while h != start:
+                        path.append(h)
+                        h = parents[h]
+                    path.append(start)
+                    path.reverse()
+                    return path
+                if cells[n] == path_value:
+                    parents[n] = h
+                    heads.append(n)
+        return []
+
+    def clear(self) -> None:
+        # Remove all states, e.g. to replay a run from the start
+        self.cells[:] = bytes(len(self.cells))
+
+    def to_grid(self) -> bytes:
+        # Grid of the maze with the states of all FREE cells on top, using big integers as bit vectors
+        grid = self.maze.grid[:]
+        free = int.from_bytes(grid.translate(FREE_MASK_TABLE), "little")
+        merged = int.from_bytes(grid, "little") | (int.from_bytes(self.cells, "little") & free)
+        return merged.to_bytes(len(self.cells), "little")
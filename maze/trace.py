@@ -0,0 +1,139 @@
+import logging
+import struct
+from array import array
+from typing import Optional
+
+from maze.maze import Maze
+from maze.state import SolverState
+
+# Every event is packed into one integer: The cell index shifted left by 3 bits and the new cell value (0-6).
+# The unused value 7 marks a reset to an empty state layer (e.g. before the next algorithm starts).
+VALUE_BITS = 3
+VALUE_MASK = (1 << VALUE_BITS) - 1
+RESET = VALUE_MASK
+
+# Trace file format (*.mzt): A header followed by the packed events
+MZT_MAGIC = b"MZT1"
+MZT_HEADER = struct.Struct("<4scxxxIIQ")  # Magic, array typecode, size_x, size_y, number of events
+
+
+def _typecode(size_x: int, size_y: int) -> str:
+    # Use 32 bit events as long as every cell index fits, 64 bit otherwise
+    return "I" if (size_x + 2) * (size_y + 2) < 1 << (32 - VALUE_BITS) else "Q"
+
+
+class TraceRecorder:
+    size_x: int
+    size_y: int
+    capacity: Optional[int]  # Keep only the most recent events (ring buffer), None to keep all of them
+    events: array
+    total: int  # Number of events recorded so far, including the ones dropped from the ring buffer
+
+    def __init__(self, maze: Maze, capacity: Optional[int] = None) -> None:
+        self.size_x, self.size_y = maze.size_x, maze.size_y
+        self.capacity = capacity
+        self.events = array(_typecode(self.size_x, self.size_y))
+        self.total = 0
+
+    def record(self, index: int, value: int) -> None:
+        event = (index << VALUE_BITS) | value
+        if self.capacity is None or self.total < self.capacity:
+            self.events.append(event)
+        else:
+            self.events[self.total % self.capacity] = event
+        self.total += 1
+
+    def reset(self) -> None:
+        self.record(0, RESET)
+
+    def get_events(self) -> array:
+        # Recorded events in chronological order
+        if self.capacity is None or self.total <= self.capacity:
+            return self.events
+        split = self.total % self.capacity
+        return self.events[split:] + self.events[:split]
+
+    def save(self, file_name: str) -> None:
+        events = self.get_events()
+        with open(file_name, "wb") as file:
+            file.write(MZT_HEADER.pack(MZT_MAGIC, events.typecode.encode(), self.size_x, self.size_y, len(events)))
+            file.write(events.tobytes())
+        logging.info(f"Saved trace with {len(events)} events to {file_name}.")
+
+
+def load_trace(file_name: str, maze: Maze) -> array:
+    # Read the events of a trace file recorded for the given maze
+    with open(file_name, "rb") as file:
+        header = file.read(MZT_HEADER.size)
+        if len(header) < MZT_HEADER.size or not header.startswith(MZT_MAGIC):
+            msg = f"Not a trace file: {file_name}"
+            logging.error(msg, exc_info=True)
+            raise ValueError(msg)
+        _, typecode, size_x, size_y, count = MZT_HEADER.unpack(header)
+        if (size_x, size_y) != maze.get_size():
+            msg = f"Trace {file_name} was recorded for a {size_x}x{size_y} maze, not for {maze.size_x}x{maze.size_y}."
+            logging.error(msg, exc_info=True)
+            raise ValueError(msg)
+        events = array(typecode.decode())
+        events.frombytes(file.read(count * events.itemsize))
+    if len(events) != count:
+        msg = f"Trace file {file_name} is truncated."
+        logging.error(msg, exc_info=True)
+        raise ValueError(msg)
+    return events
+
+
+class TracePlayer:
+    maze: Maze
+    state: SolverState  # Layer the events are applied to, cleared on RESET events and when seeking backwards
+    events: array
+    position: int  # Number of events applied
+    steps_per_frame: int
+    fast_forward: bool  # Play ten times faster
+    playing: bool
+    redraw: bool  # All states were cleared (reset or seek backwards) since the flag was cleared
+
+    def __init__(self, maze: Maze, events: array, steps_per_frame: int = 1) -> None:
+        self.maze = maze
+        self.state = SolverState(maze)
+        self.events = events
+        self.position = 0
+        self.steps_per_frame = max(1, steps_per_frame)
+        self.fast_forward = False
+        self.playing = True
+        self.redraw = False
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def update(self) -> None:
+        # Called once per frame
+        if self.playing:
+            self.step(self.steps_per_frame * (10 if self.fast_forward else 1))
+
+    def step(self, count: int) -> None:
+        # Apply the next events, the state layer records them as changed cells as usual
+        end = min(len(self.events), self.position + count)
+        set_cell = self.state.set_cell
+        for event in self.events[self.position:end]:
+            value = event & VALUE_MASK
+            if value == RESET:
+                self._restore()
+            else:
+                set_cell(event >> VALUE_BITS, value)
+        self.position = end
+
+    def seek(self, position: int) -> None:
+        # Jump to any position, seeking backwards replays from an empty state layer
+        position = max(0, min(len(self.events), position))
+        if position < self.position:
+            self._restore()
+            self.position = 0
+        self.step(position - self.position)
+
+    def finished(self) -> bool:
+        return self.position >= len(self.events)
+
+    def _restore(self) -> None:
+        self.state.clear()
+        self.redraw = True
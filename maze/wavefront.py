@@ -0,0 +1,83 @@
+from typing import List
+
+try:
+    import numpy
+except ImportError:  # Optional, the wavefront algorithm runs as a plain breadth-first search without it
+    numpy = None
+
+from maze.maze import Maze, MazeCell
+from maze.state import SolverState
+
+
+# Initial distance of every cell value: FREE (and START) cells are not reached yet, END cells are the goal, all others
+# blocked. The search itself starts at distance 0, any other START cell is just a free cell.
+UNREACHED, BLOCKED, GOAL = -1, -2, -3
+INITIAL_DISTANCES = [BLOCKED] * 256
+INITIAL_DISTANCES[MazeCell.FREE.value] = UNREACHED
+INITIAL_DISTANCES[MazeCell.START.value] = UNREACHED
+INITIAL_DISTANCES[MazeCell.END.value] = GOAL
+
+
+class Wavefront:
+    # Breadth-first search from START expanding a whole layer (all cells at the same distance) at once with NumPy.
+    # The frontier is an array of cell indices: The neighbors of all its cells are gathered in one go, filtered by
+    # their distance (FREE cells not reached yet) and deduplicated by letting every cell remember the last position
+    # it was written to. A mask of the whole grid per layer would be far slower, any layer is much smaller.
+    offsets: "numpy.ndarray"
+    distances: "numpy.ndarray"  # Steps from START of every reached cell, UNREACHED, BLOCKED or GOAL for all others
+    positions: "numpy.ndarray"  # Scratch space for the deduplication
+    frontier: "numpy.ndarray"  # Cells of the current layer
+    depth: int  # Distance of the current layer
+    end: int  # END cell reached, -1 if none (yet)
+    expanded: int  # Number of cells expanded so far
+
+    def __init__(self, maze: Maze, start: int) -> None:
+        self.offsets = numpy.array(maze.offsets, numpy.intp)
+        self.distances = numpy.array(INITIAL_DISTANCES, numpy.int32)[numpy.frombuffer(maze.grid, numpy.uint8)]
+        self.distances[start] = 0
+        self.positions = numpy.zeros(len(self.distances), numpy.int32)
+        self.frontier = numpy.array([start], numpy.intp)
+        self.depth = 0
+        self.end = -1
+        self.expanded = 0
+
+    def grow(self) -> None:
+        # Expand the current layer: Either an END cell is reached or the next layer becomes the frontier
+        neighbors = (self.frontier[:, None] + self.offsets).ravel()
+        distances = self.distances[neighbors]
+        self.expanded += len(self.frontier)
+        ends = neighbors[distances == GOAL]
+        if len(ends):
+            self.end = int(ends[0])
+            return
+        neighbors = neighbors[distances == UNREACHED]
+        order = numpy.arange(len(neighbors), dtype=numpy.int32)
+        self.positions[neighbors] = order
+        neighbors = neighbors[self.positions[neighbors] == order]
+        self.depth += 1
+        self.distances[neighbors] = self.depth
+        self.frontier = neighbors
+
+    def path(self) -> List[int]:
+        # Cells from START to the END cell reached (both included), found by descending the distances
+        if self.end == -1:
+            return []
+        distances = self.distances
+        offsets = self.offsets.tolist()
+        index = self.end
+        path = [index]
+        for d in range(self.depth, -1, -1):
+            index = next(index + offset for offset in offsets if distances[index + offset] == d)
+            path.append(index)
+        path.reverse()
+        return path
+
+
+def set_cells(state: SolverState, cells: "numpy.ndarray", value: int) -> None:
+    # SolverState.set_cell() for many cells, written at once unless every change is tracked, traced or logged
+    if state.dirty is None and state.trace is None and not state.log_changes:
+        numpy.frombuffer(state.cells, numpy.uint8)[cells] = value
+        state.writes += len(cells)
+    else:
+        for index in cells.tolist():
+            state.set_cell(index, value)